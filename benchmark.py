@@ -0,0 +1,181 @@
+# Offline benchmark of the optimization engine
+# Runs every optimizer, Performance and computeBLreturns on synthetic data across a grid of
+# asset counts and history lengths, and writes wall time, solver iterations, function
+# evaluations and peak memory to a JSON results file.
+#
+#   python benchmark.py --assets 10 50 200 --history 250 1000 --output results.json
+#   python benchmark.py --baseline results.json --tolerance 0.25
+#
+# With --baseline, every case is compared against the stored results and the script exits
+# with status 1 if any case got slower than baseline * (1 + tolerance).
+
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import contextlib
+import io
+import logging
+import numpy as np
+import pandas as pd
+import scipy
+import mopEngine.models as models
+import mopEngine.telemetry as telemetry
+from mopEngine.portfolio import Portfolio
+from mopEngine.blackLitterman import computeBLreturns
+from mopEngine.providers import DataProvider, SyntheticProvider, StaticMarketCaps
+
+# Serving slices of one pre-generated synthetic frame, so backtests time the engine, not data generation
+class PreloadedProvider(DataProvider):
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    def Download(self, tickers, start=None, end=None, period=None):
+        index = self.frame.index
+        rows = (index >= pd.Timestamp(start)) & (index < pd.Timestamp(end)) if start is not None else slice(None)
+        return self.frame.loc[rows, [(ticker, "Close") for ticker in tickers]]
+
+# Timing one call (best of `repeat`) and measuring its peak traced memory in a separate run
+# Solver statistics (summed over every solve in the call) come from the first timed run
+# Console output of the engine (market weight printouts) is discarded
+def measure(call, repeat):
+    times = []
+    solves = None
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(repeat):
+            with telemetry.record() as stats:
+                start = time.perf_counter()
+                call()
+                times.append(time.perf_counter() - start)
+            solves = stats["solves"] if solves is None else solves
+
+        tracemalloc.start()
+        call()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "seconds": min(times),
+        "nit": sum(solve["nit"] or 0 for solve in solves),
+        "nfev": sum(solve["nfev"] or 0 for solve in solves),
+        "njev": sum(solve["njev"] or 0 for solve in solves),
+        "peak_mb": peak / 2**20
+    }
+
+# Benchmark cases for one (assets, history) grid point
+def cases(assets, history, seed):
+    tickers = [f"SYN{i:04d}" for i in range(assets)]
+    caps = StaticMarketCaps({ticker: float(i + 1) for i, ticker in enumerate(tickers)})
+
+    end = pd.Timestamp("2024-01-01")
+    frame = SyntheticProvider(seed=seed).Download(tickers, start=end - pd.tseries.offsets.BDay(history + 1), end=end)
+
+    portfolio = Portfolio(tickers, 100000, PreloadedProvider(frame), caps)
+    portfolio.history = frame
+
+    # Fitting the shared inputs up front so each case times its own stage only
+    portfolio.covar, portfolio.volatility
+
+    for method in models.OPTIMIZERS:
+        yield method, lambda method=method: portfolio.Optimize(method)
+
+    yield "performance", lambda: list(portfolio.Performance(start_date=portfolio.history.index[0], end_date=end))
+
+    # Two views: a relative one between the first two assets and an absolute one on the third
+    P = np.zeros((2, assets))
+    P[0, 0], P[0, 1], P[1, 2 % assets] = 1, -1, 1
+    Q = np.array([0.0002, 0.0004])
+    OMEGA = np.diag([1e-5, 1e-5])
+
+    yield "black-litterman", lambda: computeBLreturns(tickers, portfolio.covar, P, Q, OMEGA, marketCaps=caps)
+
+# Running the whole grid
+def run(assets, history, methods=None, repeat=3, seed=0):
+    results = []
+
+    for n in assets:
+        for T in history:
+            for name, call in cases(n, T, seed):
+                if methods and name not in methods:
+                    continue
+
+                try:
+                    result = measure(call, repeat)
+                    result["error"] = None
+                except Exception as e:
+                    result = {"seconds": None, "nit": None, "nfev": None, "njev": None, "peak_mb": None, "error": str(e)}
+
+                result = {"case": name, "assets": n, "history": T, **result}
+                results.append(result)
+                print(f"{name:>16} n={n:<5} T={T:<6} " + (f"{result['seconds']:9.4f}s  nit={result['nit']:<6} nfev={result['nfev']:<7} peak={result['peak_mb']:.1f}MB" if result["error"] is None else f"FAILED: {result['error']}"), flush=True)
+
+    return results
+
+# Comparing results with a stored baseline
+# Returns the cases slower than baseline * (1 + tolerance)
+def compare(results, baseline, tolerance):
+    stored = {(r["case"], r["assets"], r["history"]): r for r in baseline["results"]}
+    regressions = []
+
+    for result in results:
+        previous = stored.get((result["case"], result["assets"], result["history"]))
+        if previous is None or not previous["seconds"] or result["seconds"] is None:
+            continue
+
+        result["baseline_seconds"] = previous["seconds"]
+        result["ratio"] = result["seconds"] / previous["seconds"]
+
+        if result["ratio"] > 1 + tolerance:
+            regressions.append(result)
+            print(f"REGRESSION {result['case']} n={result['assets']} T={result['history']}: {previous['seconds']:.4f}s -> {result['seconds']:.4f}s ({result['ratio']:.2f}x)")
+
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the optimization engine")
+    parser.add_argument("--assets", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--history", type=int, nargs="+", default=[250, 1000])
+    parser.add_argument("--methods", nargs="+", default=None, help="subset of cases to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--baseline", default=None, help="results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    # Engine modules set their own levels
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("mopEngine"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+    results = run(args.assets, args.history, args.methods, args.repeat, args.seed)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+
+    report = {
+        "meta": {
+            "timestamp": pd.Timestamp.now().isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed
+        },
+        "results": results
+    }
+
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
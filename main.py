@@ -1,7 +1,14 @@
+import sys
 from mopEngine.portfolio import Portfolio
 import numpy as np
 from tabulate import tabulate
 
+# With arguments, runs a job file non-interactively (see mopEngine/batch.py)
+#   python main.py jobs.json --workers 8 --output results.jsonl
+if len(sys.argv) > 1:
+    import mopEngine.batch as batch
+    sys.exit(batch.main())
+
 #TICKERS = ["AAPL", "TSLA", "MSFT", "JPM"]
 #AMOUNT = 10000
 
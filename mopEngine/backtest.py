@@ -0,0 +1,252 @@
+import os
+import numpy as np
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import mopEngine.models as models
+import mopEngine.estimators as estimators
+import mopEngine.telemetry as telemetry
+
+# Logging system
+# Taking config from root
+logger = logging.getLogger(__name__)
+
+# Metric names, in reporting order
+METRICS = [
+    'Sharpe Ratio',
+    'Sortino Ratio',
+    'Volatility',
+    'Mean Return',
+    'Total Return',
+    'CAGR',
+    'Max Drawdown'
+]
+
+# Daily return paths for K static weight vectors
+# equityReturns is (T x n), weights is (n,) or (K x n); result is (T x K)
+# From the second day on, the drifted weights are rebalanced back to target,
+# costing cost * turnover
+def portfolioReturns(equityReturns, weights, cost=0):
+
+    W = np.atleast_2d(weights)
+    R = np.asarray(equityReturns)
+
+    returns = R @ W.T
+
+    if cost and len(R) > 1:
+        # Weights after drifting with the previous day's returns (K x T-1 x n)
+        drifted = W[:, None, :] * (1 + R[:-1])[None, :, :]
+        drifted /= drifted.sum(axis=2, keepdims=True)
+
+        turnover = np.abs(W[:, None, :] - drifted).sum(axis=2)
+        returns[1:] -= cost * turnover.T
+
+    return returns
+
+# Daily return path for time-varying target weights
+# targets is (T x n): the weights held on each day
+# Each day costs cost * turnover from the previous day's drifted weights to that day's target
+def pathReturns(equityReturns, targets, cost=0):
+
+    R = np.asarray(equityReturns)
+    W = np.asarray(targets)
+
+    returns = np.einsum('tn,tn->t', W, R)
+
+    if cost and len(R) > 1:
+        drifted = W[:-1] * (1 + R[:-1])
+        drifted /= drifted.sum(axis=1, keepdims=True)
+
+        turnover = np.abs(W[1:] - drifted).sum(axis=1)
+        returns[1:] -= cost * turnover
+
+    return returns
+
+# Merging the count, mean and sum of squared deviations of a chunk into running ones
+# (Chan et al. pairwise update; per column, counts may differ between columns)
+def _merge(count, mean, M2, chunkCount, chunkMean, chunkM2):
+    total = count + chunkCount
+    share = np.divide(chunkCount, total, out=np.zeros_like(mean), where=total > 0)
+    delta = chunkMean - mean
+
+    return total, mean + delta * share, M2 + chunkM2 + delta ** 2 * count * share
+
+# Running metrics over a stream of return chunks for K portfolios
+# Every chunk is (rows x K) portfolio returns, reduced in one pass and merged into constant-size state:
+#   mean and variance (and those of the negative returns) with pairwise Welford updates,
+#   total return as a sum of log(1 + r), drawdown as the running peak of log wealth.
+# Memory is O(K) whatever the number of rows; Metrics() matches metrics() on the concatenated rows.
+class RunningMetrics:
+
+    def __init__(self, portfolios=1, periods=252):
+        self.periods = periods
+        self.count = 0
+        self.mean, self.M2 = np.zeros(portfolios), np.zeros(portfolios)
+        self.downCount, self.downMean, self.downM2 = np.zeros(portfolios), np.zeros(portfolios), np.zeros(portfolios)
+        self.logWealth, self.logPeak, self.logDrawdown = np.zeros(portfolios), np.zeros(portfolios), np.zeros(portfolios)
+
+    def Add(self, returns):
+        returns = np.asarray(returns, dtype=float)
+        if returns.ndim == 1:
+            returns = returns[:, None]
+        if not len(returns):
+            return self
+
+        chunkMean = returns.mean(axis=0)
+        self.count, self.mean, self.M2 = _merge(
+            self.count, self.mean, self.M2, len(returns), chunkMean, ((returns - chunkMean) ** 2).sum(axis=0)
+        )
+
+        # Downside moments over negative returns only
+        negative = returns < 0
+        downCount = negative.sum(axis=0)
+        downMean = np.where(negative, returns, 0).sum(axis=0) / np.maximum(downCount, 1)
+        downM2 = np.where(negative, (returns - downMean) ** 2, 0).sum(axis=0)
+        self.downCount, self.downMean, self.downM2 = _merge(self.downCount, self.downMean, self.downM2, downCount, downMean, downM2)
+
+        # Log wealth path of the chunk, continuing from the running level and peak
+        with np.errstate(divide='ignore'):
+            path = self.logWealth + np.cumsum(np.log1p(returns), axis=0)
+        peaks = np.maximum(np.maximum.accumulate(path, axis=0), self.logPeak)
+        self.logDrawdown = np.maximum(self.logDrawdown, (peaks - path).max(axis=0))
+        self.logWealth, self.logPeak = path[-1], peaks[-1]
+
+        return self
+
+    # Annualised metrics over every row added so far
+    # Returns {metric: array of K values}
+    def Metrics(self):
+        T, periods = self.count, self.periods
+        std = np.sqrt(self.M2 / max(T, 1))
+        downsideSTD = np.where(self.downCount > 0, np.sqrt(self.downM2 / np.maximum(self.downCount, 1)), np.nan)
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            sharpe = np.sqrt(periods) * self.mean / std
+            sortino = np.where(downsideSTD > 0, np.sqrt(periods) * self.mean / downsideSTD, np.nan)
+            cagr = np.expm1(self.logWealth * periods / T) if T else np.full(len(self.mean), np.nan)
+
+        return {
+            'Sharpe Ratio': sharpe,
+            'Sortino Ratio': sortino,
+            'Volatility': std * np.sqrt(periods),
+            'Mean Return': self.mean,
+            'Total Return': np.expm1(self.logWealth),
+            'CAGR': cagr,
+            'Max Drawdown': -np.expm1(-self.logDrawdown)
+        }
+
+# Annualised metrics for every column of a (T x K) return matrix
+# Returns {metric: array of K values}
+def metrics(returns, periods=252):
+    returns = np.asarray(returns)
+    portfolios = 1 if returns.ndim == 1 else returns.shape[1]
+    return RunningMetrics(portfolios, periods).Add(returns).Metrics()
+
+# Rows of a (T x n) return matrix in chunks of `rows`
+# source is an array (a np.memmap stays on disk) or the path (str or os.PathLike) of a .npy file, which is memory-mapped
+def chunks(source, rows=100_000):
+    if isinstance(source, (str, os.PathLike)):
+        source = np.load(source, mmap_mode="r", allow_pickle=False)
+
+    for start in range(0, len(source), rows):
+        yield source[start:start + rows]
+
+# Backtesting K static weight vectors over a stream of (rows x n) equity return chunks
+# Each chunk is turned into portfolio returns and folded into RunningMetrics, so memory is
+# bounded by the chunk size; rebalancing costs carry across chunk boundaries.
+# Returns {metric: array of K values}, equal to backtest() on the concatenated chunks
+def streamBacktest(stream, weights, cost=0, periods=252):
+    logger.info("RUNNING STREAMING BACKTEST")
+
+    W = np.atleast_2d(weights)
+    running = RunningMetrics(len(W), periods)
+    last = None
+
+    with telemetry.stage("backtest"):
+        for chunk in stream:
+            chunk = np.asarray(chunk, dtype=float)
+            if not len(chunk):
+                continue
+
+            # The first day of a chunk is charged for drifting over the last day of the previous one
+            if cost and last is not None:
+                running.Add(portfolioReturns(np.vstack([last, chunk]), W, cost)[1:])
+            else:
+                running.Add(portfolioReturns(chunk, W, cost))
+            last = chunk[-1:]
+
+    return running.Metrics()
+
+# Backtesting K static weight vectors over one return matrix in a single pass
+def backtest(equityReturns, weights, cost=0, periods=252):
+    logger.info("RUNNING VECTORIZED BACKTEST")
+    with telemetry.stage("backtest"):
+        return metrics(portfolioReturns(equityReturns, weights, cost), periods)
+
+# Optimizing one walk-forward window (runs inside worker processes)
+# Covariance, volatility and scenarios are all estimated on the trailing window
+# A failed solve returns None so the caller can keep the previous allocation
+def _solveWindow(task):
+    method, tickers, train, model, factors, params = task
+
+    n = train.shape[1]
+    logtrain = np.log1p(train)
+
+    try:
+        return models.Solve(
+            method, np.ones(n) / n, estimators.covariance(train, model, factors),
+            estimators.volatility(logtrain) if method.lower() == "mdp" else None,
+            train, tickers, **params
+        )
+    except Exception as e:
+        logger.warning(f"WINDOW OPTIMIZATION FAILED: {e}")
+        return None
+
+# Walk-forward rolling rebalancing backtest
+# returns is an aligned (T x n) matrix indexed by dates
+# On every rebalance day (every `rebalance` rows from the first date >= start) the
+# method is re-solved on the previous `window` rows; the result is held until the next rebalance.
+# Window solves are independent and fanned out to a process pool of `workers` (None = all cores)
+# covariance/factors select the risk model estimated on every window (see estimators.covariance)
+def walkForward(dates, returns, tickers, method, start=None, window=100, rebalance=21, cost=0, workers=None, periods=252, covariance="ledoit-wolf", factors=10, **params):
+
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    returns = np.ascontiguousarray(returns)
+    T, n = returns.shape
+
+    first = window if start is None else max(window, int(np.searchsorted(dates, np.datetime64(start, 'ns'))))
+    if first >= T:
+        raise ValueError("Not enough history for the requested window and start date")
+
+    points = np.arange(first, T, rebalance)
+    tasks = [(method, tickers, returns[i-window:i], covariance, factors, params) for i in points]
+
+    logger.info(f"WALK-FORWARD: {len(points)} WINDOWS")
+
+    # A single window (or worker) runs in-process
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            solved = list(pool.map(_solveWindow, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+    else:
+        solved = [_solveWindow(task) for task in tasks]
+
+    # Failed windows keep the previous allocation (equal weights before the first success)
+    allocations = []
+    current = np.ones(n) / n
+    for weights in solved:
+        if weights is not None:
+            current = weights
+        allocations.append(current)
+    allocations = np.array(allocations)
+
+    # Expanding rebalance allocations to the weights held on each day
+    held = np.repeat(allocations, np.diff(np.append(points, T)), axis=0)
+    path = pathReturns(returns[first:], held, cost)
+
+    return {
+        "rebalances": dates[points],
+        "weights": allocations,
+        "dates": dates[first:],
+        "returns": path,
+        "metrics": metrics(path, periods)
+    }
@@ -0,0 +1,308 @@
+# Non-interactive batch runner
+# Runs a book of portfolio jobs from a job file and streams one JSON line per result.
+#
+#   python -m mopEngine.batch jobs.json --workers 8 --output results.jsonl
+#
+# The job file is a JSON object (or a list of jobs):
+#
+#   {
+#     "defaults": {"amount": 10000, "window": 100, "period": 465, "covariance": "ledoit-wolf"},
+#     "jobs": [
+#       {"id": "core", "tickers": ["AAPL", "MSFT", "JPM"], "methods": ["variance", "cvar"],
+#        "params": {"confidence": 0.95}, "backtest": {"start": "2020-01-01", "end": "2025-01-01", "cost": 0.0005}},
+#       {"id": "views", "tickers": ["AAPL", "TSLA", "MSFT"], "method": "mean-variance",
+#        "views": {"P": [[0, 1, -1]], "Q": [0.05], "OMEGA": [0.0025]}}
+#     ]
+#   }
+#
+# Each job names its tickers and one method (or a list of methods) plus Optimize parameters,
+# optional Black-Litterman views (P, Q and OMEGA, which may be the vector of its diagonal),
+# an optional backtest window, and Portfolio settings (amount, window, period, covariance,
+# factors, dtype) that override the defaults.
+#
+# Data is fetched once per distinct date range for the union of all tickers that need it,
+# and market caps once for every mean-variance ticker, before any job runs. Jobs then run
+# on a process pool with no further network access and results are written as they complete,
+# so the book takes about as long as its slowest jobs rather than the sum of all of them.
+# A failed job produces a result with "error" set; the other jobs are unaffected.
+
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import importlib
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import mopEngine.backtest as backtest
+import mopEngine.telemetry as telemetry
+from mopEngine.prices import PriceStore
+
+# Logging system
+# Taking config from root
+logger = logging.getLogger(__name__)
+
+# Job settings passed to Portfolio, with their defaults
+SETTINGS = {"amount": 10000, "window": 100, "period": 465, "covariance": "ledoit-wolf", "factors": 10, "dtype": "float64"}
+
+# Reading a job file into a list of jobs with defaults applied
+# Every job gets an id (its position when not given) and a list of methods
+def loadJobs(path):
+    with open(path) as file:
+        book = json.load(file)
+
+    if isinstance(book, list):
+        book = {"jobs": book}
+
+    defaults = {**SETTINGS, **book.get("defaults", {})}
+
+    jobs = []
+    for i, job in enumerate(book["jobs"]):
+        job = {**defaults, **job}
+        job.setdefault("id", str(i))
+
+        if "tickers" not in job:
+            raise ValueError(f"Job {job['id']} has no tickers")
+
+        methods = job.pop("methods", None) or [job.pop("method", "variance")]
+        job.pop("method", None)
+        job["methods"] = [method.lower() for method in methods]
+        job.setdefault("params", {})
+
+        jobs.append(job)
+
+    return jobs
+
+# Downloading tickers over one date range
+# Providers that reject a whole request over one unknown ticker (e.g. FileProvider) are retried
+# ticker by ticker, so the tickers they do have are still fetched
+def _download(provider, tickers, start, end, period):
+    try:
+        with telemetry.stage("fetch"):
+            return provider.Download(tickers, start=start, end=end, period=period)
+    except Exception as e:
+        if len(tickers) == 1:
+            raise
+        logger.warning(f"FETCHING TICKERS ONE BY ONE: {e}")
+
+    import pandas as pd
+
+    frames = []
+    for ticker in tickers:
+        try:
+            with telemetry.stage("fetch"):
+                frames.append(provider.Download([ticker], start=start, end=end, period=period))
+        except Exception as e:
+            logger.error(f"FETCH OF {ticker} FAILED: {e}")
+
+    frames = [frame for frame in frames if not frame.empty]
+    return pd.concat(frames, axis=1).sort_index() if frames else pd.DataFrame()
+
+# Downloading each distinct date range once, for the union of the tickers that need it
+# requests maps (start, end, period) to a set of tickers
+# Returns (PriceStore per key, error message per key that could not be fetched)
+def _fetch(provider, requests):
+    stores, errors = {}, {}
+    for (start, end, period), tickers in requests.items():
+        tickers = sorted(tickers)
+        logger.info(f"FETCHING {len(tickers)} TICKERS FOR {start or period} - {end or 'TODAY'}")
+
+        try:
+            frame = _download(provider, tickers, start, end, period)
+            if frame.empty:
+                raise ValueError(f"No data returned from provider for {start or period} - {end or 'today'}")
+
+            # Tickers the provider had no data for only fail the jobs that use them (see prepare)
+            found = [ticker for ticker in tickers if (ticker, "Close") in frame.columns]
+            stores[(start, end, period)] = PriceStore.FromFrame(frame, found)
+        except Exception as e:
+            logger.error(f"FETCH FOR {start or period} - {end or 'TODAY'} FAILED: {e}")
+            errors[(start, end, period)] = str(e)
+
+    return stores, errors
+
+# Backtest date range of a job, or None
+def _window(job):
+    test = job.get("backtest")
+    return None if not test else (str(test["start"]), str(test["end"]), None)
+
+# Result of a (job, method) that produced no portfolio
+def _failed(job, method, error, seconds=0.0):
+    return {
+        "id": job["id"], "method": method, "tickers": list(job["tickers"]), "params": job["params"],
+        "weights": None, "allocation": None, "metrics": None, "stages": {}, "error": error, "seconds": seconds
+    }
+
+# Fetching everything the book needs up front and building one task per (job, method)
+# Tasks carry their own close prices, so workers need neither a provider nor the network
+# A job whose data could not be fetched or selected gets an error result per method instead
+# Returns (tasks, failed results)
+def prepare(jobs, provider, marketCaps=None):
+    requests = {}
+    for job in jobs:
+        requests.setdefault((None, None, job["period"]), set()).update(job["tickers"])
+        if _window(job) is not None:
+            requests.setdefault(_window(job), set()).update(job["tickers"])
+
+    stores, errors = _fetch(provider, requests)
+
+    # Market caps for every mean-variance ticker, resolved once
+    capped = sorted({ticker for job in jobs if "mean-variance" in job["methods"] for ticker in job["tickers"]})
+    caps = {}
+    if capped:
+        if marketCaps is None:
+            from mopEngine.providers import defaultMarketCaps
+            marketCaps = defaultMarketCaps
+        with telemetry.stage("marketcaps"):
+            caps = marketCaps.MarketCaps(capped)
+
+    tasks, failed = [], []
+    for job in jobs:
+        keys = [(None, None, job["period"])] + ([_window(job)] if _window(job) is not None else [])
+        try:
+            for key in keys:
+                if key in errors:
+                    raise ValueError(errors[key])
+
+            history = stores[keys[0]].Select(job["tickers"])
+            testReturns = stores[keys[1]].Select(job["tickers"]).Returns()[1] if len(keys) > 1 else None
+        except Exception as e:
+            logger.error(f"JOB {job['id']} HAS NO DATA: {e}")
+            failed.extend(_failed(job, method, str(e)) for method in job["methods"])
+            continue
+
+        for method in job["methods"]:
+            jobCaps = {ticker: caps.get(ticker, 0.0) for ticker in job["tickers"]} if method == "mean-variance" else None
+            tasks.append((job, method, history.dates, history.closes, testReturns, jobCaps))
+
+    return tasks, failed
+
+# Running one (job, method) task (inside worker processes)
+# Engine console output is sent to stderr so stdout stays valid JSON lines
+def runJob(task):
+    job, method, dates, closes, testReturns, caps = task
+
+    from mopEngine.portfolio import Portfolio
+    from mopEngine.providers import StaticMarketCaps
+
+    result = {"id": job["id"], "method": method, "tickers": list(job["tickers"]), "params": job["params"]}
+    start = time.perf_counter()
+
+    try:
+        with contextlib.redirect_stdout(sys.stderr), telemetry.record() as stats:
+            portfolio = Portfolio(
+                job["tickers"], job["amount"], marketCaps=StaticMarketCaps(caps or {}),
+                covariance=job["covariance"], factors=job["factors"], window=job["window"], dtype=job["dtype"]
+            )
+            portfolio.prices = PriceStore(dates, closes, job["tickers"], job["dtype"])
+
+            views = job.get("views") or {}
+            portfolio.Optimize(
+                method, p=None if "P" not in views else np.array(views["P"], dtype=float),
+                q=None if "Q" not in views else np.array(views["Q"], dtype=float),
+                omega=None if "OMEGA" not in views else np.array(views["OMEGA"], dtype=float),
+                **job["params"]
+            )
+
+            weights = np.asarray(portfolio.weights, dtype=float)
+            result["weights"] = dict(zip(job["tickers"], weights.tolist()))
+            result["allocation"] = dict(zip(job["tickers"], (weights * job["amount"]).round(2).tolist()))
+
+            result["metrics"] = None
+            if testReturns is not None:
+                with telemetry.stage("backtest", method=method):
+                    values = backtest.backtest(testReturns, weights[None, :], job["backtest"].get("cost", 0))
+                result["metrics"] = {metric: float(values[metric][0]) for metric in backtest.METRICS}
+
+        result["stages"] = stats["stages"]
+        result["error"] = None
+
+    except Exception as e:
+        logger.exception(f"JOB {job['id']} ({method.upper()}) FAILED")
+        return _failed(job, method, str(e), time.perf_counter() - start)
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+# Silencing engine INFO logging (also run in worker processes)
+# Portfolio sets its own logger level on import, so it is imported first
+def quiet():
+    importlib.import_module("mopEngine.portfolio")
+
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("mopEngine"):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+# Running a book of jobs, yielding results in completion order
+# workers > 1 runs jobs on a process pool (None = all cores)
+def run(jobs, provider, marketCaps=None, workers=None, silent=True):
+    tasks, failed = prepare(jobs, provider, marketCaps)
+    yield from failed
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) if tasks else 1
+    logger.info(f"RUNNING {len(tasks)} JOBS ON {workers} WORKERS")
+
+    if workers <= 1:
+        for task in tasks:
+            yield runJob(task)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=quiet if silent else None) as pool:
+        futures = [pool.submit(runJob, task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+# Command line options selecting the price provider and market cap source (shared with service.py)
+def addSourceArguments(parser):
+    parser.add_argument("--data", default=None, help="read prices from a local file or directory (FileProvider)")
+    parser.add_argument("--cache", default=None, help="cache Yahoo downloads in this directory (CachedProvider)")
+    parser.add_argument("--synthetic", type=int, default=None, metavar="SEED", help="use synthetic prices (SyntheticProvider)")
+    parser.add_argument("--caps", default=None, help="market caps file, CSV or JSON (FileMarketCaps)")
+    parser.add_argument("--verbose", action="store_true", help="keep engine INFO logging")
+
+# (provider, market cap source) selected by those options; None keeps the shared market cap cache
+def sources(args):
+    from mopEngine.providers import YahooProvider, FileProvider, SyntheticProvider, CachedProvider, FileMarketCaps
+
+    if args.synthetic is not None:
+        provider = SyntheticProvider(seed=args.synthetic)
+    elif args.data is not None:
+        provider = FileProvider(args.data)
+    elif args.cache is not None:
+        provider = CachedProvider(YahooProvider(), args.cache)
+    else:
+        provider = YahooProvider()
+
+    return provider, None if args.caps is None else FileMarketCaps(args.caps)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a book of portfolio jobs and stream results as JSON lines")
+    parser.add_argument("jobs", help="job file (JSON)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--output", default=None, help="results file (default: stdout)")
+    addSourceArguments(parser)
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        quiet()
+
+    provider, marketCaps = sources(args)
+    jobs = loadJobs(args.jobs)
+    output = open(args.output, "w") if args.output else sys.stdout
+
+    failed = 0
+    try:
+        for result in run(jobs, provider, marketCaps, args.workers, silent=not args.verbose):
+            failed += result["error"] is not None
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,63 +1,205 @@
-import time
-import yfinance as yf
 import numpy as np
+from collections import OrderedDict
+from scipy.linalg import cho_factor, cho_solve, LinAlgError
 import logging
+from mopEngine.cache import fingerprint
+import mopEngine.telemetry as telemetry
 
 # Logging system
 # Taking config from root
 logger = logging.getLogger(__name__)
 
-# Black Litterman return model
-def computeBLreturns(tickers, COVARIANCE, P, Q, OMEGA, lam=2.5,  TAU=0.025):
-    
-    # Computing market cap
-    data = []
-    logger.info("FETCHING MARKET CAPITAL")
-    for ticker in tickers:
-        # Obtaining market cap
-        info = yf.Ticker(ticker).info
-        data.append(info.get('marketCap', 0))
-
-        # Logging message if market caps are unable to be found
-        # Takes weight as 0
-        if np.isnan(data[-1]) or data[-1] == 0:
-            logger.warning(f"UNABLE TO FETCH MARKET CAP FOR {ticker}")
-            print(f"Unable to get market capital for {ticker}")
-
-        # Sleeping for 1 second to prevent throttling yfinance
-        time.sleep(1)
-    
-    # Computing market weights
-    # Asset CAP / Total Portfolio CAP
-    # Richer the asset, greater the market weight
-    marketWeights = np.array(data) / np.array(data).sum()
-
-    # Computing Market Implied returns
-    BIG_PIE = lam * (COVARIANCE @ marketWeights)
-
-    # Logging Market Weights
-    print("MARKET WEIGHTS:", dict(zip(tickers, marketWeights)))
-
-    # When views are not given
-    if (P.any() == False and Q.any() == False and OMEGA.any() == False):
-        # Market Implied returns are returned
-        logger.info("BLACK-LITTERMAN SUCCESSFUL")
-        return BIG_PIE
-    
-    else:
-        # Caching reused matrices
-        COV_CONF = np.linalg.inv(TAU * COVARIANCE)
-        try:
-            OMEGA_INV = np.linalg.inv(OMEGA)
-        except np.linalg.LinAlgError:
+# Black Litterman prior: market weights and market implied returns for one covariance
+# Posteriors are computed without forming any inverse. With k views on n assets
+#   k <= n: PI + TAU*SIGMA*P.T (P*TAU*SIGMA*P.T + OMEGA)^-1 (Q - P*PI)   (Woodbury form)
+#           one covariance product per view and a k x k Cholesky solve, cached per (P, OMEGA)
+#           so view sets that only change Q reuse it
+#   k > n:  (I + TAU*SIGMA*P.T OMEGA^-1 P)^-1 (PI + TAU*SIGMA*P.T OMEGA^-1 Q)   (information form)
+# Both equal the textbook posterior mean. OMEGA may be a k x k matrix or the vector of its
+# diagonal; diagonal OMEGA is applied by division. Factor covariances are never made dense.
+class BlackLitterman:
+
+    CACHE = 64
+
+    # marketCaps is a market cap source; the shared process-wide cache is used by default
+    def __init__(self, tickers, COVARIANCE, lam=2.5, TAU=0.025, marketCaps=None):
+
+        # Computing market cap
+        logger.info("FETCHING MARKET CAPITAL")
+        if marketCaps is None:
+            # Providers (and pandas) are only loaded when the shared default is needed
+            from mopEngine.providers import defaultMarketCaps
+            marketCaps = defaultMarketCaps
+        with telemetry.stage("marketcaps"):
+            caps = marketCaps.MarketCaps(tickers)
+
+        data = []
+        for ticker in tickers:
+            data.append(caps.get(ticker, 0))
+
+            # Logging message if market caps are unable to be found
+            # Takes weight as 0
+            if np.isnan(data[-1]) or data[-1] == 0:
+                logger.warning(f"UNABLE TO FETCH MARKET CAP FOR {ticker}")
+                print(f"Unable to get market capital for {ticker}")
+
+        # Computing market weights
+        # Asset CAP / Total Portfolio CAP
+        # Richer the asset, greater the market weight
+        self.marketWeights = np.array(data) / np.array(data).sum()
+
+        # Logging Market Weights
+        print("MARKET WEIGHTS:", dict(zip(tickers, self.marketWeights)))
+
+        self.tickers = tickers
+        self.COVARIANCE = COVARIANCE
+        self.TAU = TAU
+
+        # Computing Market Implied returns
+        self.PI = lam * (COVARIANCE @ self.marketWeights)
+
+        # (P, OMEGA) fingerprint -> (TAU*SIGMA*P.T, Cholesky factor of the k x k view system)
+        self._factors = OrderedDict()
+
+    # Normalizing one view set to (P, Q, OMEGA, diagonal OMEGA or None)
+    @staticmethod
+    def _views(P, Q, OMEGA):
+        P = np.atleast_2d(np.asarray(P, dtype=float))
+        Q = np.asarray(Q, dtype=float).ravel()
+        OMEGA = np.asarray(OMEGA, dtype=float)
+
+        if OMEGA.ndim == 1:
+            diagonal = OMEGA
+        elif not np.any(OMEGA - np.diag(np.diagonal(OMEGA))):
+            diagonal = np.diagonal(OMEGA)
+        else:
+            diagonal = None
+
+        singular = np.any(diagonal == 0) if diagonal is not None else np.linalg.slogdet(OMEGA)[0] == 0
+        if singular:
             logger.error("NON-INVERTIBLE OMEGA")
             raise ValueError("UNCERTAINTY MATRIX (OMEGA) IS NON-INVERTIBLE")
 
-        # Computing two mutliples of Black Litterman Model
-        M1 = np.linalg.inv(COV_CONF + (P.T @ OMEGA_INV @ P)) # Posterior Covariance Matrix
-        M2 = (COV_CONF) @ BIG_PIE + (P.T @ OMEGA_INV @ Q) # Adjusted return vector
-        
-        # Flattening to 1D array... if it isnt
-        BLreturns = (M1 @ M2).flatten()
+        return P, Q, OMEGA, diagonal
+
+    # When views are not given, the market implied returns are returned
+    @staticmethod
+    def _empty(P, Q, OMEGA):
+        return not np.any(P) and not np.any(Q) and not np.any(OMEGA)
+
+    # More views than assets are solved in the information form (dense covariance only)
+    def _informationForm(self, P):
+        return len(P) > P.shape[1] and isinstance(self.COVARIANCE, np.ndarray)
+
+    # Cached (TAU*SIGMA*P.T, factor) for a view matrix and its uncertainty
+    # SIGMA_P may be passed in when it was computed as part of a batch
+    def _factor(self, P, OMEGA, diagonal, SIGMA_P=None):
+        key = fingerprint(P, OMEGA)
+        if key in self._factors:
+            self._factors.move_to_end(key)
+            return self._factors[key]
+
+        if SIGMA_P is None:
+            SIGMA_P = self.TAU * (self.COVARIANCE @ P.T)
+
+        system = P @ SIGMA_P
+        if diagonal is not None:
+            system[np.diag_indices_from(system)] += diagonal
+        else:
+            system = system + OMEGA
+
+        # Symmetric positive definite for any valid OMEGA; general solves otherwise
+        try:
+            factor = ("cholesky", cho_factor(system))
+        except LinAlgError:
+            factor = ("general", system)
+
+        self._factors[key] = (SIGMA_P, factor)
+        if len(self._factors) > self.CACHE:
+            self._factors.popitem(last=False)
+
+        return SIGMA_P, factor
+
+    @staticmethod
+    def _solve(factor, rhs):
+        kind, value = factor
+        if kind == "cholesky":
+            return cho_solve(value, rhs)
+        return np.linalg.solve(value, rhs)
+
+    # Information form for more views than assets (dense covariance)
+    def _information(self, P, Q, OMEGA, diagonal):
+        SIGMA_P = self.TAU * (self.COVARIANCE @ P.T)
+
+        # OMEGA^-1 applied to P and Q
+        if diagonal is not None:
+            WP, WQ = P / diagonal[:, None], Q / diagonal
+        else:
+            WP, WQ = np.linalg.solve(OMEGA, P), np.linalg.solve(OMEGA, Q)
+
+        n = len(self.PI)
+        return np.linalg.solve(np.eye(n) + SIGMA_P @ WP, self.PI + SIGMA_P @ WQ)
+
+    # Posterior returns for one view set
+    def Posterior(self, P, Q, OMEGA):
+
+        if self._empty(P, Q, OMEGA):
+            logger.info("BLACK-LITTERMAN SUCCESSFUL")
+            return self.PI
+
+        P, Q, OMEGA, diagonal = self._views(P, Q, OMEGA)
+
+        if self._informationForm(P):
+            BLreturns = self._information(P, Q, OMEGA, diagonal)
+        else:
+            SIGMA_P, factor = self._factor(P, OMEGA, diagonal)
+            BLreturns = self.PI + SIGMA_P @ self._solve(factor, Q - P @ self.PI)
+
         logger.info("BLACK-LITTERMAN SUCCESSFUL")
-        return BLreturns
\ No newline at end of file
+        return BLreturns
+
+    # Posterior returns for many view sets against this prior
+    # views is a sequence of (P, Q, OMEGA); returns an (m x n) array, one row per view set
+    # The covariance products of every uncached view matrix are computed in one multiplication
+    def Batch(self, views):
+
+        normalized = [None if self._empty(*view) else self._views(*view) for view in views]
+
+        # Stacking the view matrices whose factorization is not cached yet
+        pending = [
+            i for i, view in enumerate(normalized)
+            if view is not None and fingerprint(view[0], view[2]) not in self._factors
+            and not self._informationForm(view[0])
+        ]
+        products = {}
+        if pending:
+            stacked = np.vstack([normalized[i][0] for i in pending])
+            SIGMA_P = self.TAU * (self.COVARIANCE @ stacked.T)
+            offsets = np.cumsum([0] + [len(normalized[i][0]) for i in pending])
+            products = {i: SIGMA_P[:, offsets[j]:offsets[j + 1]] for j, i in enumerate(pending)}
+
+        results = np.empty((len(views), len(self.PI)))
+        for i, view in enumerate(normalized):
+            if view is None:
+                results[i] = self.PI
+                continue
+
+            P, Q, OMEGA, diagonal = view
+            if self._informationForm(P):
+                results[i] = self._information(P, Q, OMEGA, diagonal)
+            else:
+                SIGMA_P, factor = self._factor(P, OMEGA, diagonal, products.get(i))
+                results[i] = self.PI + SIGMA_P @ self._solve(factor, Q - P @ self.PI)
+
+        logger.info(f"BLACK-LITTERMAN SUCCESSFUL FOR {len(views)} VIEW SETS")
+        return results
+
+# Black Litterman return model
+# marketCaps is a market cap source; the shared process-wide cache is used by default
+def computeBLreturns(tickers, COVARIANCE, P, Q, OMEGA, lam=2.5,  TAU=0.025, marketCaps=None):
+    return BlackLitterman(tickers, COVARIANCE, lam, TAU, marketCaps).Posterior(P, Q, OMEGA)
+
+# Black Litterman returns for many view sets sharing one prior (market caps are fetched once)
+# views is a sequence of (P, Q, OMEGA); returns an (m x n) array
+def batchBLreturns(tickers, COVARIANCE, views, lam=2.5, TAU=0.025, marketCaps=None):
+    return BlackLitterman(tickers, COVARIANCE, lam, TAU, marketCaps).Batch(views)
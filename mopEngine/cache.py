@@ -0,0 +1,148 @@
+import os
+import glob
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import logging
+from mopEngine.estimators import FactorCovariance
+import mopEngine.telemetry as telemetry
+
+# Logging system
+# Taking config from root
+logger = logging.getLogger(__name__)
+
+# Feeding one value into a digest
+# Arrays are hashed by dtype, shape and raw bytes; scenario sets by the inputs that generate them
+def _update(digest, value):
+    if value is None:
+        digest.update(b"None")
+
+    elif isinstance(value, np.ndarray):
+        digest.update(f"{value.dtype}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).data)
+
+    elif isinstance(value, FactorCovariance):
+        _update(digest, ("factor", value.loadings, value.specific))
+
+    elif hasattr(value, "Chunks"):
+        _update(digest, (
+            "scenarios", value.kind, value.count, value.chunk, value.seed, value.df, str(value.dtype), value.history,
+            getattr(value, "_cholesky", None), getattr(value, "_loadings", None), getattr(value, "_specific", None)
+        ))
+
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"[{len(value)}".encode())
+        for item in value:
+            _update(digest, item)
+
+    elif isinstance(value, dict):
+        _update(digest, sorted(value.items()))
+
+    else:
+        digest.update(repr(value).encode())
+
+# Stable hex digest of any mix of arrays, covariance models, scenario sets and plain values
+def fingerprint(*values):
+    digest = hashlib.blake2b(digest_size=16)
+    _update(digest, values)
+    return digest.hexdigest()
+
+# LRU cache of optimization results
+# Keys are "<data fingerprint>-<parameter fingerprint>", so results are only found again on the
+# data they were solved on; stale entries age out under the LRU bound, and Invalidate(data)
+# drops everything solved on one data set explicitly.
+# With a directory, results are also written there as .npy files and survive restarts;
+# entries evicted from memory are then still found on disk.
+# Hits, misses and evictions are counted (Stats()) and reported as telemetry "cache" events.
+class ResultCache:
+
+    def __init__(self, size=256, directory=None):
+        self.size = size
+        self.directory = directory
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"hit": 0, "miss": 0, "eviction": 0}
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def Key(data, params):
+        return f"{data}-{params}"
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def _count(self, event, times=1):
+        with self._lock:
+            self._counts[event] += times
+
+        for _ in range(times):
+            telemetry.emit({"type": "cache", "event": event})
+
+    # Cached weights for key, or None
+    def Get(self, key):
+        with self._lock:
+            weights = self._entries.get(key)
+            if weights is not None:
+                self._entries.move_to_end(key)
+
+        if weights is None and self.directory is not None and os.path.exists(self._path(key)):
+            weights = np.load(self._path(key), allow_pickle=False)
+            self._insert(key, weights)
+
+        self._count("hit" if weights is not None else "miss")
+        return None if weights is None else weights.copy()
+
+    def Put(self, key, weights):
+        weights = np.array(weights, dtype=float)
+        self._insert(key, weights)
+
+        if self.directory is not None:
+            np.save(self._path(key), weights, allow_pickle=False)
+
+    # Adding to memory, evicting the least recently used entries beyond size
+    def _insert(self, key, weights):
+        evicted = 0
+        with self._lock:
+            self._entries[key] = weights
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                evicted += 1
+
+        if evicted:
+            self._count("eviction", evicted)
+
+    # Dropping every result solved on one data fingerprint
+    def Invalidate(self, data):
+        prefix = f"{data}-"
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+        if self.directory is not None:
+            for path in glob.glob(os.path.join(self.directory, f"{prefix}*.npy")):
+                os.remove(path)
+
+    def Clear(self):
+        with self._lock:
+            self._entries.clear()
+
+        if self.directory is not None:
+            for path in glob.glob(os.path.join(self.directory, "*.npy")):
+                os.remove(path)
+
+    def Stats(self):
+        with self._lock:
+            hits, misses, evictions = self._counts["hit"], self._counts["miss"], self._counts["eviction"]
+            entries = len(self._entries)
+
+        return {
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "hitRate": hits / (hits + misses) if hits + misses else 0.0
+        }
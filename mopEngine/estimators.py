@@ -0,0 +1,165 @@
+import numpy as np
+
+# Risk estimators shared by Portfolio and the window-based engines
+
+# Covariance models accepted by covariance()
+COVARIANCE_MODELS = ("ledoit-wolf", "factor")
+
+# Low-rank plus diagonal covariance: SIGMA = B B^T + diag(D)
+# Stores n*k + n numbers instead of n*n and supports the operations the
+# optimizers use (SIGMA @ x, x @ SIGMA, scalar scaling) in O(nk)
+class FactorCovariance:
+
+    # Makes ndarray operators (x @ SIGMA, c * SIGMA) defer to this class
+    __array_ufunc__ = None
+
+    def __init__(self, loadings, specific):
+        self.loadings = np.ascontiguousarray(loadings)
+        self.specific = np.asarray(specific)
+
+    @property
+    def shape(self):
+        n = len(self.specific)
+        return (n, n)
+
+    # SIGMA @ x for a vector or an (n x m) matrix
+    def __matmul__(self, x):
+        x = np.asarray(x)
+        specific = self.specific if x.ndim == 1 else self.specific[:, None]
+        return self.loadings @ (self.loadings.T @ x) + specific * x
+
+    # x @ SIGMA, using symmetry
+    def __rmatmul__(self, x):
+        return (self @ np.asarray(x).T).T
+
+    # Scaling by a non-negative scalar (horizon scaling)
+    def __mul__(self, c):
+        return FactorCovariance(self.loadings * np.sqrt(c), self.specific * c)
+
+    __rmul__ = __mul__
+
+    def diagonal(self):
+        return np.einsum('ik,ik->i', self.loadings, self.loadings) + self.specific
+
+    # Dense n x n matrix (only for small universes)
+    def toarray(self):
+        return self.loadings @ self.loadings.T + np.diag(self.specific)
+
+# Ledoit-Wolf shrunk covariance of a (T x n) return matrix
+# Shrinks the biased sample covariance towards mu*I with the Ledoit-Wolf (2004) intensity,
+# matching sklearn.covariance.LedoitWolf without depending on scikit-learn
+def ledoitWolf(returns):
+    returns = np.atleast_2d(np.asarray(returns, dtype=float))
+    T, n = returns.shape
+
+    centered = returns - returns.mean(axis=0)
+    S = (centered.T @ centered) / T
+    if n == 1:
+        return S
+
+    norms = np.einsum('ij,ij->i', centered, centered)
+    trace = norms.sum() / T
+    mu = trace / n
+
+    frobenius = np.sum(S ** 2)
+    beta = (norms @ norms / T - frobenius) / (n * T)
+    delta = (frobenius - 2 * mu * trace + n * mu ** 2) / n
+    shrinkage = 0.0 if beta == 0 else min(beta, delta) / delta
+
+    shrunk = (1 - shrinkage) * S
+    shrunk.flat[::n + 1] += shrinkage * mu
+    return shrunk
+
+# Running sums over a rolling window of return rows
+# Rows enter with Add and leave with Remove at O(n^2) each, and LedoitWolf() reproduces
+# ledoitWolf() on the rows currently held: the centred fourth-moment term of the shrinkage
+# intensity expands into the sums of x, x x^T, |x|^2, |x|^4 and |x|^2 x kept here.
+class RollingMoments:
+
+    def __init__(self, returns):
+        returns = np.atleast_2d(np.asarray(returns, dtype=float))
+        n = returns.shape[1]
+
+        self.count = 0
+        self.sum = np.zeros(n)
+        self.outer = np.zeros((n, n))
+        self.norms = 0.0
+        self.squaredNorms = 0.0
+        self.weighted = np.zeros(n)
+        self.updates = 0
+
+        self._accumulate(returns, 1)
+        self.updates = 0
+
+    def _accumulate(self, rows, sign):
+        rows = np.atleast_2d(np.asarray(rows, dtype=float))
+        norms = np.einsum('ij,ij->i', rows, rows)
+
+        self.count += sign * len(rows)
+        self.sum += sign * rows.sum(axis=0)
+        self.outer += sign * (rows.T @ rows)
+        self.norms += sign * norms.sum()
+        self.squaredNorms += sign * (norms @ norms)
+        self.weighted += sign * (norms @ rows)
+        self.updates += len(rows)
+
+    def Add(self, rows):
+        self._accumulate(rows, 1)
+
+    def Remove(self, rows):
+        self._accumulate(rows, -1)
+
+    # Ledoit-Wolf shrinkage towards a scaled identity, as ledoitWolf()
+    def LedoitWolf(self):
+        T, n = self.count, len(self.sum)
+        mean = self.sum / T
+        meanNorm = mean @ mean
+
+        # Biased sample covariance and its trace
+        S = self.outer / T - np.outer(mean, mean)
+        trace = self.norms / T - meanNorm
+        mu = trace / n
+
+        # Sum over rows of |x - mean|^4
+        fourth = (
+            self.squaredNorms + 4 * (mean @ self.outer @ mean) - 4 * (mean @ self.weighted)
+            + 2 * meanNorm * self.norms - 3 * T * meanNorm ** 2
+        )
+
+        frobenius = np.sum(S ** 2)
+        beta = (fourth / T - frobenius) / (n * T)
+        delta = (frobenius - 2 * mu * trace + n * mu ** 2) / n
+        shrinkage = 0.0 if beta == 0 else min(beta, delta) / delta
+
+        shrunk = (1 - shrinkage) * S
+        shrunk.flat[::n + 1] += shrinkage * mu
+        return shrunk
+
+# Statistical (PCA) factor model of a (T x n) return matrix
+# The top k principal components form the factors; the remaining variance of
+# each asset is kept as its idiosyncratic (diagonal) term
+def factorModel(returns, factors=10):
+    T, n = returns.shape
+    k = max(1, min(factors, T - 1, n))
+
+    centered = returns - returns.mean(axis=0)
+    _, s, Vt = np.linalg.svd(centered, full_matrices=False)
+
+    loadings = Vt[:k].T * (s[:k] / np.sqrt(T - 1))
+    variance = (centered ** 2).sum(axis=0) / (T - 1)
+    specific = np.maximum(variance - (loadings ** 2).sum(axis=1), 1e-12)
+
+    return FactorCovariance(loadings, specific)
+
+# Dispatching to the selected covariance model
+def covariance(returns, model="ledoit-wolf", factors=10):
+    if model == "factor":
+        return factorModel(returns, factors)
+    if model == "ledoit-wolf":
+        return ledoitWolf(returns)
+
+    raise ValueError(f"Invalid covariance model: {model}")
+
+# Per-asset volatility from a (T x n) log return matrix
+def volatility(logreturns):
+    return np.round(logreturns.std(axis=0, ddof=1), 5)
@@ -1,112 +1,394 @@
-from scipy.optimize import minimize
+from scipy.optimize import minimize, linprog, OptimizeResult
+from scipy import sparse
 import numpy as np
 from mopEngine.blackLitterman import computeBLreturns
+import mopEngine.telemetry as telemetry
 import logging
 
 # Logging system
 # Taking config from root
 logger = logging.getLogger(__name__)
 
+# SLSQP settings shared by every model
+# The objectives here are of order 1e-4 to 1, so the default ftol (1e-6) stops far from the optimum
+SLSQP_OPTIONS = {'ftol': 1e-10, 'maxiter': 500}
+
+# Euclidean projection onto the probability simplex {w >= 0, SUM w = 1}
+# Sort-based, O(n log n)
+def _projectSimplex(v):
+    u = np.sort(v)[::-1]
+    css = np.cumsum(u) - 1
+    k = np.arange(1, len(v) + 1)
+    rho = np.nonzero(u - css / k > 0)[0][-1]
+    return np.maximum(v - css[rho] / (rho + 1), 0)
+
+# Accelerated projected gradient (FISTA) over the simplex
+# f returns (value, gradient); the step size is found by backtracking and
+# momentum is restarted whenever the objective goes up.
+# Stops once the Frank-Wolfe gap falls below tol relative to the gradient scale.
+# Every iterate is feasible, so an unconverged run still returns a valid portfolio.
+# Returns (weights, converged, iterations)
+def _projectedGradient(f, w, maxiter=5000, tol=1e-6):
+
+    x = _projectSimplex(np.asarray(w, dtype=float))
+    fx, gx = f(x)
+
+    # Initial Lipschitz estimate from a small probe step
+    probe = _projectSimplex(x - 1e-3 * gx / max(np.abs(gx).max(), 1e-12))
+    _, gp = f(probe)
+    dist = np.linalg.norm(probe - x)
+    L = np.linalg.norm(gp - gx) / dist if dist > 0 else 1.0
+    L = max(L, 1e-12)
+
+    y, fy, gy, t = x, fx, gx, 1.0
+    for iteration in range(maxiter):
+
+        # Backtracking on the quadratic upper bound
+        while True:
+            z = _projectSimplex(y - gy / L)
+            fz, gz = f(z)
+            step = z - y
+            if fz <= fy + gy @ step + (L / 2) * (step @ step) + 1e-15:
+                break
+            L *= 2
+
+        # Frank-Wolfe gap: bounds the suboptimality for convex objectives
+        # and measures stationarity for MDP
+        if gz @ z - gz.min() <= tol * np.abs(gz).max() or np.linalg.norm(z - x) < 1e-12:
+            return (z, True, iteration + 1) if fz <= fx else (x, True, iteration + 1)
+
+        # Adaptive restart from the last accepted point
+        # A plain projected step from x that still fails to descend means
+        # rounding has taken over, so x is returned as is
+        if fz > fx:
+            if y is x:
+                return x, True, iteration + 1
+            t = 1.0
+            y, fy, gy = x, fx, gx
+            continue
+
+        tNext = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = z + ((t - 1) / tNext) * (z - x)
+        x, fx, gx, t = z, fz, gz, tNext
+        fy, gy = f(y)
+
+        # Letting the step grow back after backtracking
+        L *= 0.9
+
+    return x, False, maxiter
+
+# Running an objective through the selected solver
+# "slsqp": scipy SLSQP with analytic gradient, "pgd": accelerated projected gradient
+def _simplexSolve(f, w, solver):
+    if solver == "pgd":
+        evaluations = [0]
+        def counted(x):
+            evaluations[0] += 1
+            return f(x)
+
+        weights, converged, iterations = _projectedGradient(counted, w)
+        telemetry.solver("pgd", OptimizeResult(
+            nit=iterations, nfev=evaluations[0], njev=evaluations[0], status=0 if converged else 1,
+            success=converged, message="Converged" if converged else "Iteration limit reached"
+        ))
+        if not converged:
+            logger.warning("PROJECTED GRADIENT REACHED ITERATION LIMIT")
+        return weights
+
+    result = minimize(f, w, method='SLSQP', jac=True, options=SLSQP_OPTIONS, bounds=[(0,1)]*len(w), constraints= [{'type':'eq','fun': lambda x: x.sum()-1}])
+    telemetry.solver("slsqp", result)
+    return result.x if result.success else None
+
+# Checking the solver name for the covariance models
+def _checkSolver(solver):
+    if solver not in ("slsqp", "pgd"):
+        logger.error("INVALID SOLVER")
+        raise ValueError(f"Invalid solver: {solver}")
+
+# Scenario matrices arrive either as an ndarray or as a scenarios.ScenarioSet,
+# which is generated chunk by chunk and never held whole.
+# The scenario objectives accumulate their sums over these chunks.
+def _chunks(returns):
+    if hasattr(returns, "Chunks"):
+        return returns.Chunks()
+    return (returns,)
+
+# Objective functions
+# Each factory returns f(w) -> (value, gradient) to be minimized over the simplex,
+# shared by the models below and the multi-objective engine (pareto.py).
+# CVaR is the exception: it works on x = [weights, VaR level v] (Rockafellar-Uryasev)
+
+# weights.T * COVARIANCE * weights
+def varianceObjective(SIGMA):
+    def f(w):
+        SIGMAw = SIGMA @ w
+        return w @ SIGMAw, 2 * SIGMAw
+    return f
+
+# -(weights.T * assetVolatility) / sqrt(VARIANCE), the negative diversification ratio
+def diversificationObjective(SIGMA, sigma):
+    def f(w):
+        SIGMAw = SIGMA @ w
+        var = w @ SIGMAw
+        weightvol = w @ sigma
+        vol = np.sqrt(var)
+
+        value = -1 * (weightvol / vol)
+        grad = -(sigma / vol - weightvol * SIGMAw / (vol * var))
+        return value, grad
+    return f
+
+# -weights.T * expected returns
+def returnObjective(mean):
+    def f(w):
+        return -(w @ mean), -mean
+    return f
+
+# v + 1/(1-CONFIDENCE)N * SUM{N} (max(-wR-v, 0)), minimized over v at the CVaR of the weights
+# Returns objective and its (sub)gradient in a single pass
+def cvarObjective(returns, ALPHA):
+    def f(x):
+
+        w = x[:-1]
+        v = x[-1]
+
+        N = returns.shape[0]
+        scale = 1 / ((1 - ALPHA) * N)
+
+        SUM, tailGrad, tailCount = 0.0, np.zeros(len(w)), 0
+        for chunk in _chunks(returns):
+            excess = -(chunk @ w) - v
+            tail = (excess > 0).astype(float)
+
+            SUM += np.sum(excess * tail)
+            tailGrad += tail @ chunk
+            tailCount += tail.sum()
+
+        value = v + scale * SUM
+        grad = np.append(-scale * tailGrad, 1 - scale * tailCount)
+
+        return value, grad
+    return f
+
+# -E[log(1+fr*wTr)]
+def kellyObjective(returns, fr):
+    def f(w):
+
+        N = returns.shape[0]
+
+        SUM, GRAD = 0.0, np.zeros(len(w))
+        for chunk in _chunks(returns):
+            portfolio_returns = chunk @ w
+
+            # Expectation robust against outliers
+            # Clipped scenarios contribute nothing to the gradient
+            active = portfolio_returns > -0.99
+            growth = 1 + fr * np.maximum(portfolio_returns, -0.99)
+
+            SUM += np.log(growth).sum()
+            GRAD += (fr * active / growth) @ chunk
+
+        return -SUM / N, -GRAD / N
+    return f
+
+# -E[W^(1-gamma)/(1-gamma)]
+def crraObjective(returns, gamma):
+    def f(w):
+
+        N = returns.shape[0]
+
+        SUM, GRAD = 0.0, np.zeros(len(w))
+        for chunk in _chunks(returns):
+            wealth = 1 + chunk @ w
+
+            # Expectation robust against outliers
+            # Clipped scenarios contribute nothing to the gradient
+            active = wealth > 0.01
+            wealth_multiple = np.maximum(wealth, 0.01)
+
+            SUM += np.sum(wealth_multiple ** (1-gamma))
+            GRAD += (active * wealth_multiple ** (-gamma)) @ chunk
+
+        return -SUM / (N * (1-gamma)), -GRAD / N
+    return f
+
+# 1/theta * log E[exp(-theta * X)]
+def ermObjective(returns, theta):
+    def f(w):
+
+        N = returns.shape[0]
+
+        # Running log-sum-exp: sums are rescaled whenever a chunk raises the shift,
+        # which keeps large losses from overflowing
+        shift, SUM, GRAD = -np.inf, 0.0, np.zeros(len(w))
+        for chunk in _chunks(returns):
+            X = -theta * (chunk @ w)
+
+            top = X.max()
+            if top > shift:
+                rescale = np.exp(shift - top)
+                SUM, GRAD, shift = SUM * rescale, GRAD * rescale, top
+
+            expX = np.exp(X - shift)
+            SUM += expX.sum()
+            GRAD += expX @ chunk
+
+        value = (shift + np.log(SUM / N)) / theta
+        grad = -GRAD / SUM
+
+        return value, grad
+    return f
+
 # Variance model
-def Variance(w, SIGMA):
+def Variance(w, SIGMA, solver="slsqp"):
 
     logger.info("VARIANCE OPTIMIZATION INITIATED")
+    _checkSolver(solver)
 
     # Variance Objective
     # minimize {weights.T * COVARIANCE * weights}
-    def f(w):
-        return w @ SIGMA @ w
+    f = varianceObjective(SIGMA)
     
-    result = minimize(f, w, method='SLSQP', bounds=[(0,1)]*len(w), constraints= [{'type':'eq','fun': lambda x: x.sum()-1}])
-    if result.success:
+    weights = _simplexSolve(f, w, solver)
+    if weights is not None:
         logger.info("VARIANCE OPTIMIZATION SUCCESSFUL")
-        return result.x
+        return weights
     else:
         logger.error("VARIANCE OPTIMIZATION FAILED")
         raise ValueError("Variance Optimization failed")
 
 # Maximum Diversification Portfolio Model
-def MDP(w, SIGMA, sigma):
+def MDP(w, SIGMA, sigma, solver="slsqp"):
 
     logger.info("MDP OPTIMIZATION INITIATED")
+    _checkSolver(solver)
 
     # MDP Objecitve
     # maximize {(weights.T * assetVolatility) / sqrt(VARIANCE)}
-    def f(w):
-        var = w @ SIGMA @ w
-        weightvol = w @ sigma
-
-        return -1 * (weightvol / np.sqrt(var))
+    f = diversificationObjective(SIGMA, sigma)
     
-    result = minimize(f, w, method='SLSQP', bounds=[(0,1)]*len(w), constraints= [{'type':'eq','fun': lambda x: x.sum()-1}])
-    if result.success:
+    weights = _simplexSolve(f, w, solver)
+    if weights is not None:
         logger.info("MDP OPTIMIZATION SUCCESSFUL")
-        return result.x
+        return weights
     else:
         logger.error("MDP OPTIMIZATION FAILED")
         raise ValueError("Max Diversification Optimization failed")
 
 # Mean-Variance model
-def MVO(w, SIGMA, LAMBDA, tickers, p, q, omega, lambdaBL, TAU):
+def MVO(w, SIGMA, LAMBDA, tickers, p, q, omega, lambdaBL, TAU, marketCaps=None, solver="slsqp"):
 
     logger.info("MVO OPTIMIZATION INITIATED")
+    _checkSolver(solver)
 
     # Computing Black Litterman Returns
-    BLret = computeBLreturns(tickers, SIGMA, P=p, Q=q, OMEGA=omega, lam=lambdaBL, TAU=TAU)
+    BLret = computeBLreturns(tickers, SIGMA, P=p, Q=q, OMEGA=omega, lam=lambdaBL, TAU=TAU, marketCaps=marketCaps)
 
     # MVO Objective
     # maximize {weights.T * returns - VARIANCE}
     def f(w):
-        return (LAMBDA/2)*(w @ SIGMA @ w) - (w @ BLret)
+        SIGMAw = SIGMA @ w
+        return (LAMBDA/2)*(w @ SIGMAw) - (w @ BLret), LAMBDA * SIGMAw - BLret
     
-    result = minimize(f, w, method='SLSQP', bounds=[(0,1)]*len(w), constraints= [{'type':'eq','fun': lambda x: x.sum()-1}])
-    if result.success:
+    weights = _simplexSolve(f, w, solver)
+    if weights is not None:
         logger.info("MVO OPTIMIZATION SUCCESSFUL")
-        return result.x
+        return weights
     else:
         logger.error("MVO OPTIMIZATION FAILED")
         raise ValueError("Mean-Variance Optimization failed")
 
+# Scenario mean, one pass over the chunks
+def _scenarioMean(returns):
+    total = np.zeros(returns.shape[1])
+    for chunk in _chunks(returns):
+        total += chunk.sum(axis=0, dtype=float)
+    return total / returns.shape[0]
+
+# VaR of the initial weights, estimated on the first chunk
+def _initialVaR(returns, w, ALPHA):
+    return np.quantile(-(next(iter(_chunks(returns))) @ w), ALPHA)
+
+# Rockafellar-Uryasev program for CVaR
+# Variables are stacked as [weights (n), VaR level v (1), scenario excess u (N)]
+# CVaR = c @ x at the optimum, subject to u >= -wR - v, u >= 0, SUM weights = 1
+# Returns (c, A_ub, b_ub, A_eq, b_eq, bounds)
+def cvarProgram(returns, ALPHA):
+
+    N, n = returns.shape
+    scale = 1 / ((1 - ALPHA) * N)
+
+    # Objective coefficients
+    c = np.concatenate([np.zeros(n), [1.0], np.full(N, scale)])
+
+    # Scenario constraints -wR - v - u <= 0, sparse in the auxiliary block
+    A_ub = sparse.hstack([
+        sparse.csr_matrix(-returns),
+        sparse.csr_matrix(-np.ones((N, 1))),
+        -sparse.identity(N, format='csr')
+    ], format='csr')
+    b_ub = np.zeros(N)
+
+    # Budget constraint
+    A_eq = sparse.csr_matrix(np.concatenate([np.ones(n), np.zeros(N + 1)]))
+    b_eq = np.array([1.0])
+
+    bounds = [(0,1)]*n + [(None,None)] + [(0,None)]*N
+
+    return c, A_ub, b_ub, A_eq, b_eq, bounds
+
+# Linear program for (Mean-)CVaR
+# Minimize {v + 1/(1-CONFIDENCE)N * SUM{N} u - MEAN * weights}
+def _cvarLP(returns, ALPHA, mean=False):
+
+    n = returns.shape[1]
+    c, A_ub, b_ub, A_eq, b_eq, bounds = cvarProgram(returns, ALPHA)
+    if mean:
+        c[:n] = -returns.mean(axis=0)
+
+    result = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
+    telemetry.solver("highs", result)
+    if result.success:
+        return result.x[:n]
+
+    return None
+
 # Conditional Value-at-Risk (CVaR) model
-def CVaR(w, tickers, ALPHA, data):
+def CVaR(w, ALPHA, returns, solver="slsqp"):
     
     logger.info("CVAR OPTIMIZATION INITIATED")
 
     # CVaR Objective 
     # Minimize {v + 1/(1-CONFIDENCE)N * SUM{N} (max(-wR-v, 0))}
-    def f(x):
-
-        w = x[:-1]
-        v = x[-1]
-
-        N = trimmed_returns.shape[0]
-        SUM = 0
-
-        for i in range(N):
-            sample = trimmed_returns[i]
-            var_excess = max(-np.dot(w, sample) - v, 0)
-            SUM += var_excess
-
-        return v + (SUM / ((1 - ALPHA) * N))
+    f = cvarObjective(returns, ALPHA)
 
     # Robustness check
     if ALPHA > 1 or ALPHA < 0:
         logger.error("INVALID CVAR CONFIDENCE")
         raise ValueError("Confidence is out of bounds (0,1)")
+    if solver not in ("slsqp", "lp"):
+        logger.error("INVALID CVAR SOLVER")
+        raise ValueError(f"Invalid solver: {solver}")
+    if solver == "lp" and hasattr(returns, "Chunks"):
+        logger.error("INVALID CVAR SOLVER")
+        raise ValueError("The LP solver needs an in-memory scenario matrix")
     
-    V = 1
+    # Starting v at the VaR of the initial weights, its optimal value for them
+    V = _initialVaR(returns, w, ALPHA)
     x0 = np.append(w, V)
 
-    returns_list = []
-    for i in tickers:
-        stock_returns = data[i]["Close"].pct_change(fill_method=None).dropna().values
-        returns_list.append(stock_returns)
-
-    # Failsafe
-    minLen = min(len(x) for x in returns_list)
-    trimmed_returns = np.array([r[-minLen:] for r in returns_list]).T
-
-    result = minimize(f, x0, method='SLSQP', bounds=[(0,1)]*len(w) + [(None,None)], constraints= [{'type':'eq','fun': lambda x: x[:-1].sum()-1}])
+    # Exact LP solve
+    if solver == "lp":
+        weights = _cvarLP(returns, ALPHA)
+        if weights is not None:
+            logger.info("CVAR OPTIMIZATION SUCCESSFUL")
+            return weights
+        else:
+            logger.error("CVAR OPTIMIZATION FAILED")
+            raise ValueError("CVaR Optimization failed")
+
+    result = minimize(f, x0, method='SLSQP', options=SLSQP_OPTIONS, jac=True, bounds=[(0,1)]*len(w) + [(None,None)], constraints= [{'type':'eq','fun': lambda x: x[:-1].sum()-1}])
+    telemetry.solver("slsqp", result)
     if result.success:
         logger.info("CVAR OPTIMIZATION SUCCESSFUL")
         return result.x[:-1]
@@ -115,50 +397,46 @@ def CVaR(w, tickers, ALPHA, data):
         raise ValueError("CVaR Optimization failed")
 
 # Mean Conditional Value-at-Risk (MCVaR) model
-def MCVaR(w, tickers, ALPHA, data):
+def MCVaR(w, ALPHA, returns, solver="slsqp"):
     
     logger.info("MCVAR OPTIMIZATION INITIATED")
 
     # MCVaR Objective 
     # Maximize {weights.T * returns - CVaR}
+    cvar = cvarObjective(returns, ALPHA)
     def f(x):
-
-        w = x[:-1]
-        v = x[-1]
-
-        N = trimmed_returns.shape[0]
-        SUM = 0
-        MEAN_TERM = 0
-
-        for i in range(N):
-            sample = trimmed_returns[i]
-            meanT = np.dot(w, sample)
-            MEAN_TERM += meanT
-            var_excess = max((-1*meanT) - v, 0)
-            SUM += var_excess
-
-        cvar = v + (SUM / ((1 - ALPHA) * N))
-
-        return cvar - (MEAN_TERM/N)
+        value, grad = cvar(x)
+        grad[:-1] -= mean_returns
+        return value - mean_returns @ x[:-1], grad
     
     # Robustness check
     if ALPHA > 1 or ALPHA < 0:
         logger.error("INVALID CVAR CONFIDENCE")
         raise ValueError("Confidence is out of bounds (0,1)")
+    if solver not in ("slsqp", "lp"):
+        logger.error("INVALID CVAR SOLVER")
+        raise ValueError(f"Invalid solver: {solver}")
+    if solver == "lp" and hasattr(returns, "Chunks"):
+        logger.error("INVALID CVAR SOLVER")
+        raise ValueError("The LP solver needs an in-memory scenario matrix")
     
-    V = 1
+    # Starting v at the VaR of the initial weights, its optimal value for them
+    V = _initialVaR(returns, w, ALPHA)
     x0 = np.append(w, V)
-
-    returns_list = []
-    for i in tickers:
-        stock_returns = data[i]["Close"].pct_change(fill_method=None).dropna().values
-        returns_list.append(stock_returns)
-
-    # Failsafe
-    minLen = min(len(x) for x in returns_list)
-    trimmed_returns = np.array([r[-minLen:] for r in returns_list]).T
-
-    result = minimize(f, x0, method='SLSQP', bounds=[(0,1)]*len(w) + [(None), (None)], constraints= [{'type':'eq','fun': lambda x: x[:-1].sum()-1}])
+    mean_returns = _scenarioMean(returns)
+
+    # Exact LP solve
+    if solver == "lp":
+        weights = _cvarLP(returns, ALPHA, mean=True)
+        if weights is not None:
+            logger.info("MCVAR OPTIMIZATION SUCCESSFUL")
+            return weights
+        else:
+            logger.error("MCVAR OPTIMIZATION FAILED")
+            raise ValueError("Mean-CVaR Optimization failed")
+
+    result = minimize(f, x0, method='SLSQP', options=SLSQP_OPTIONS, jac=True, bounds=[(0,1)]*len(w) + [(None,None)], constraints= [{'type':'eq','fun': lambda x: x[:-1].sum()-1}])
+    telemetry.solver("slsqp", result)
     if result.success:
         logger.info("MCVAR OPTIMIZATION SUCCESSFUL")
         return result.x[:-1]
@@ -167,38 +445,20 @@ def MCVaR(w, tickers, ALPHA, data):
         raise ValueError("Mean-CVaR Optimization failed")
 
 # Kelly Criterion Model
-def Kelly(w, fr, tickers, data):
+def Kelly(w, fr, returns):
     logger.info("KELLY OPTIMIZATION INITIATED")
 
     # Kelly Objective 
     # Minimize -E[log(1+wTr)]
-    def f(w):
-
-        N = trimmed_returns.shape[0]
-        SUM = 0
-
-        # Expectation robust against outliers
-        for i in range(N):
-            sample = trimmed_returns[i]
-            portfolio_returns = max(np.dot(w, sample), -0.99)
-            SUM += np.log(1+ fr * portfolio_returns)
-
-        return -SUM / N
+    f = kellyObjective(returns, fr)
 
     # Robustness check
     if fr > 1 or fr <= 0:
         logger.error("INVALID KELLY FRACTION")
         raise ValueError("Fraction is out of bounds (0,1]")
-    
-    returns_list = []
-    for i in tickers:
-        returns_list.append(data[i]["Close"].pct_change(fill_method=None).dropna().values)
-
-    # Failsafe
-    minLen = min(len(x) for x in returns_list)
-    trimmed_returns = np.array([r[-minLen:] for r in returns_list]).T
 
-    result = minimize(f, w, method='SLSQP', bounds=[(0,1)]*len(w), constraints= [{'type':'eq','fun': lambda x: x.sum()-1}])
+    result = minimize(f, w, method='SLSQP', options=SLSQP_OPTIONS, jac=True, bounds=[(0,1)]*len(w), constraints= [{'type':'eq','fun': lambda x: x.sum()-1}])
+    telemetry.solver("slsqp", result)
     if result.success:
         logger.info("KELLY OPTIMIZATION SUCCESSFUL")
         return result.x
@@ -207,38 +467,20 @@ def Kelly(w, fr, tickers, data):
         raise ValueError("Kelly Optimization failed")
     
 # Constant Relative Risk Aversion Model
-def CRRA(w, gamma, tickers, data):
+def CRRA(w, gamma, returns):
     logger.info("CRRA OPTIMIZATION INITIATED")
 
     # CRRA Objective 
     # Minimize -E[W^(1-gamma)/(1-gamma)]
-    def f(w):
-
-        N = trimmed_returns.shape[0]
-        SUM = 0
-        
-        # Expectation robust against outliers
-        for i in range(N):
-            sample = trimmed_returns[i]
-            wealth_multiple = max(1 + np.dot(w, sample), 0.01)
-            SUM += (wealth_multiple) ** (1-gamma)
-
-        return -SUM / (N * (1-gamma))
+    f = crraObjective(returns, gamma)
 
     # Robustness check
     if gamma <= 1:
         logger.error("INVALID RISK AVERSION")
         raise ValueError("Risk Aversion is out of bounds (1,inf]")
-    
-    returns_list = []
-    for i in tickers:
-        returns_list.append(data[i]["Close"].pct_change(fill_method=None).dropna().values)
-
-    # Failsafe
-    minLen = min(len(x) for x in returns_list)
-    trimmed_returns = np.array([r[-minLen:] for r in returns_list]).T
 
-    result = minimize(f, w, method='SLSQP', bounds=[(0,1)]*len(w), constraints= [{'type':'eq','fun': lambda x: x.sum()-1}])
+    result = minimize(f, w, method='SLSQP', options=SLSQP_OPTIONS, jac=True, bounds=[(0,1)]*len(w), constraints= [{'type':'eq','fun': lambda x: x.sum()-1}])
+    telemetry.solver("slsqp", result)
     if result.success:
         logger.info("CRRA OPTIMIZATION SUCCESSFUL")
         return result.x
@@ -247,40 +489,103 @@ def CRRA(w, gamma, tickers, data):
         raise ValueError("CRRA Optimization failed")
 
 # Entropic Risk Measure Model
-def ERM(w, theta, tickers, data):
+def ERM(w, theta, returns):
     logger.info("ERM OPTIMIZATION INITIATED")
 
     # ERM Objective 
     # Minimize 1/theta * log E[exp(-theta * X)]
-    def f(w):
-
-        N = trimmed_returns.shape[0]
-        SUM = 0
-
-        for i in range(N):
-            sample = trimmed_returns[i]
-            X = np.dot(w, sample)
-            SUM += np.exp(-theta * X)
-
-        return (1/theta * np.log(SUM/N))
+    f = ermObjective(returns, theta)
 
     # Robustness check
     if theta <= 0:
         logger.error("INVALID ERM RISK AVERSION")
         raise ValueError("Risk aversion is out of bounds (0,inf)")
-    
-    returns_list = []
-    for i in tickers:
-        returns_list.append(data[i]["Close"].pct_change(fill_method=None).dropna().values)
-
-    # Failsafe
-    minLen = min(len(x) for x in returns_list)
-    trimmed_returns = np.array([r[-minLen:] for r in returns_list]).T
 
-    result = minimize(f, w, method='SLSQP', bounds=[(0,1)]*len(w), constraints= [{'type':'eq','fun': lambda x: x.sum()-1}])
+    result = minimize(f, w, method='SLSQP', options=SLSQP_OPTIONS, jac=True, bounds=[(0,1)]*len(w), constraints= [{'type':'eq','fun': lambda x: x.sum()-1}])
+    telemetry.solver("slsqp", result)
     if result.success:
         logger.info("ERM OPTIMIZATION SUCCESSFUL")
         return result.x
     else:
         logger.error("ERM OPTIMIZATION FAILED")
         raise ValueError("ERM Optimization failed")
+
+# Optimizer names accepted by Solve
+OPTIMIZERS = ("variance", "mdp", "mean-variance", "cvar", "mean-cvar", "kelly", "erm", "crra")
+
+# Optimizers driven by the covariance (the rest work on the scenario matrix)
+COVARIANCE_OPTIMIZERS = ("variance", "mdp", "mean-variance")
+
+# Solvers each optimizer accepts
+SOLVERS = {
+    "variance": ("slsqp", "pgd"),
+    "mdp": ("slsqp", "pgd"),
+    "mean-variance": ("slsqp", "pgd"),
+    "cvar": ("slsqp", "lp"),
+    "mean-cvar": ("slsqp", "lp"),
+    "kelly": ("slsqp",),
+    "erm": ("slsqp",),
+    "crra": ("slsqp",)
+}
+
+# Optimizer dispatch shared by Portfolio.Optimize and the parallel engines
+# Takes plain arrays so it can run inside worker processes
+# SIGMA: covariance (may be None outside COVARIANCE_OPTIMIZERS), sigma: per-asset volatility (only used by "mdp"),
+# returns: scenario matrix
+def Solve(
+        method,
+        w,
+        SIGMA,
+        sigma,
+        returns,
+        tickers,
+        risk=0.2,
+        time=1,
+        p=None,
+        q=None,
+        omega=None,
+        confidence=0.9,
+        lambdaBL=2.5,
+        tauBL=0.025,
+        fraction=1,
+        theta=0.3,
+        gamma=3,
+        solver="slsqp",
+        marketCaps=None
+    ):
+
+    n = len(w)
+
+    # If A single Black-Litterman matrix is skipped, the entire view framework is defaulted
+    # Black-Litterman will be calculated without views. i.e. Market Implied Returns
+    if p is None or q is None or omega is None:
+        p, q, omega = np.zeros(n), np.zeros(n), np.zeros(n)
+
+    # Covariance and volatility are only scaled when the caller provided them
+    # (the scenario models need neither)
+    scaledSIGMA = None if SIGMA is None else SIGMA*time
+    scaledSigma = None if sigma is None else sigma*np.sqrt(time)
+
+    # Available Optimizers dictionary
+    optimizers = {
+        "variance":[Variance, [w, scaledSIGMA, solver]],
+        "mdp":[MDP, [w, scaledSIGMA, scaledSigma, solver]],
+        "mean-variance":[MVO, [w, scaledSIGMA, risk, tickers, p, q, omega, lambdaBL, tauBL, marketCaps, solver]],
+        "cvar":[CVaR, [w, confidence, returns, solver]],
+        "mean-cvar":[MCVaR, [w, confidence, returns, solver]],
+        "kelly": [Kelly, [w, fraction, returns]],
+        "erm": [ERM, [w, theta, returns]],
+        "crra": [CRRA, [w, gamma, returns]]
+    }
+
+    if method.lower() not in optimizers:
+        logger.error("INVALID OPTIMIZER")
+        raise ValueError(f"Invalid Optimizer method: {method}")
+
+    if solver not in SOLVERS[method.lower()]:
+        logger.error("INVALID SOLVER")
+        raise ValueError(f"Invalid solver: {solver}")
+
+    function, args = optimizers[method.lower()]
+    with telemetry.stage("optimize", method=method.lower()):
+        return function(*args)
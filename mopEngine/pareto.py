@@ -0,0 +1,570 @@
+import os
+import numpy as np
+import logging
+from scipy import sparse
+from scipy.optimize import minimize, linprog
+from concurrent.futures import ProcessPoolExecutor
+import mopEngine.models as models
+import mopEngine.telemetry as telemetry
+
+# Logging system
+# Taking config from root
+logger = logging.getLogger(__name__)
+
+# Pareto fronts over two or three of the model objectives
+# Each objective is first minimized on its own (the anchors); the anchors give the ideal and nadir
+# value of every objective, which normalize them to [0, 1] so that no objective dominates the
+# scalarization by its units. A grid of single-objective problems is then solved:
+#   "epsilon":  minimize one objective subject to each other objective <= a level,
+#               levels evenly spaced from nadir to ideal (even coverage of the front)
+#   "weighted": minimize a weighted sum of the objectives, weights on an even simplex grid
+#               (no infeasible points, but only finds the convex parts of the front)
+# Grid points are ordered so that neighbours are close, split into contiguous chunks, and each
+# chunk is solved sequentially with SLSQP, every point starting from its neighbour's solution.
+# A point that fails is retried from the anchor closest to it.
+# Fronts of return against CVaR are linear programs and are solved exactly by HiGHS instead.
+# Alongside smooth objectives, CVaR enters SLSQP in its Rockafellar-Uryasev form, restricted
+# to the scenarios around the VaR (see _tailModel), which keeps every problem smooth.
+# Covariance, volatility, expected returns and the scenario matrix are computed once and sent
+# to each worker once, when the pool starts; tasks only carry grid points.
+# Only non-dominated solutions are returned.
+
+# Objectives that can be traded off, and those reported as maximized
+# (variance, cvar and erm are risks; return, mdp (diversification ratio), kelly (log growth)
+# and crra (expected utility) are gains, minimized internally as their negatives)
+OBJECTIVES = ("variance", "return", "cvar", "mdp", "kelly", "erm", "crra")
+MAXIMIZED = ("return", "mdp", "kelly", "crra")
+
+# Objectives with a linear program form
+LINEAR = ("return", "cvar")
+
+# Objectives that are convex in the weights (as minimized), so lie above their tangent planes
+# (Kelly and CRRA clip scenario losses beyond 99%, which equity returns do not reach)
+CONVEX = ("variance", "return", "cvar", "kelly", "erm", "crra")
+
+SCHEMES = ("epsilon", "weighted")
+
+# Grid problems are normalized to [0, 1], so a looser tolerance than models.SLSQP_OPTIONS
+# still resolves them far below the grid spacing. Warm-started points take tens of iterations;
+# the lower iteration cap stops hopeless starts from taking hundreds before the retry.
+OPTIONS = {'ftol': 1e-8, 'maxiter': 200}
+
+# Normalized tolerance on levels and on the CVaR model
+FEASIBILITY = 1e-6
+
+# Normalized constraint violation up to which a solve that stopped in SLSQP's line search is kept
+# (a small fraction of the grid spacing; the point's values are evaluated exactly either way)
+SLACK = 1e-4
+
+# Scenarios either side of the VaR given their own excess variable in the CVaR model
+BAND = 16
+
+# Most tangent-plane rounds when proving a point infeasible
+ROUNDS = 50
+
+# Per-process state: shared inputs and the settings of the current call
+_state = {}
+
+# Conditional Value-at-Risk of one weight vector, and a subgradient g
+# The worst (1 - confidence) share of scenarios is averaged, the boundary scenario with its
+# fractional weight. CVaR is positively homogeneous, so CVaR(w) >= g @ w for every w,
+# with equality at these weights.
+def cvarValue(weights, returns, confidence):
+    losses = -(returns @ weights)
+    tail = (1 - confidence) * len(losses)
+    order = np.argsort(-losses)
+
+    full = int(tail)
+    q = np.zeros(len(losses))
+    q[order[:full]] = 1 / tail
+    if full < len(losses):
+        q[order[full]] = (tail - full) / tail
+
+    return q @ losses, -(q @ returns)
+
+# Exact objective callables over the weights, returning (value, gradient)
+# CVaR returns a subgradient (see cvarValue)
+def _exact(inputs):
+    returns = inputs["returns"]
+
+    return [{
+        "variance": lambda: models.varianceObjective(inputs["SIGMA"]),
+        "return": lambda: models.returnObjective(inputs["mean"]),
+        "cvar": lambda: lambda w: cvarValue(w, returns, inputs["confidence"]),
+        "mdp": lambda: models.diversificationObjective(inputs["SIGMA"], inputs["sigma"]),
+        "kelly": lambda: models.kellyObjective(returns, inputs["fraction"]),
+        "erm": lambda: models.ermObjective(returns, inputs["theta"]),
+        "crra": lambda: models.crraObjective(returns, inputs["gamma"])
+    }[name]() for name in inputs["objectives"]]
+
+# Objective callables over the SLSQP vector x
+# x holds the weights, followed by the variables of the CVaR model when "cvar" is one of the
+# objectives; CVaR itself is None here, as its model is rebuilt for every solve (see _tailModel)
+def _objectives(inputs):
+    n = inputs["n"]
+
+    functions = []
+    for name, f in zip(inputs["objectives"], _exact(inputs)):
+        if name == "cvar":
+            functions.append(None)
+            continue
+
+        # Weight-only objectives get a zero gradient for the CVaR model variables
+        def padded(x, f=f):
+            value, grad = f(x[:n])
+            full = np.zeros(len(x))
+            full[:n] = grad
+            return value, full
+
+        functions.append(padded)
+
+    return functions
+
+# Linear program over [weights, VaR level, scenario excess] (see models.cvarProgram)
+# Returns (objective rows, one per objective, A_ub, b_ub, A_eq, b_eq, bounds)
+# Rows of objectives without a linear form are zero
+def _program(inputs):
+    c, A_ub, b_ub, A_eq, b_eq, bounds = models.cvarProgram(inputs["returns"], inputs["confidence"])
+
+    rows = np.zeros((len(inputs["objectives"]), len(c)))
+    for j, name in enumerate(inputs["objectives"]):
+        if name == "cvar":
+            rows[j] = c
+        elif name == "return":
+            rows[j, :inputs["n"]] = -inputs["mean"]
+
+    return rows, A_ub, b_ub, A_eq, b_eq, bounds
+
+# Rockafellar-Uryasev model of CVaR around a weight vector, over x = [weights, v, u]
+# Scenarios are ranked by their loss on the weights. The worst, deep in the tail, enter as
+# their loss above the VaR level v; `band` scenarios either side of the VaR get an excess
+# variable u >= loss - v, u >= 0; the rest are left out. The model is never above the CVaR
+# of the weights it is solved for, so a solution whose CVaR the model matches (or that meets
+# its CVaR level) is exact.
+# Returns (c, J, x0, bounds): the model c @ x, the excess rows J @ x >= 0, the starting
+# vector and the bounds of v and u (both scaled, see below)
+def _tailModel(weights, band):
+    returns, confidence = _state["returns"], _state["confidence"]
+    N, n = returns.shape
+    tail = (1 - confidence) * N
+
+    order = np.argsort(returns @ weights)
+    deep = order[:max(int(tail) - band, 0)]
+    edge = order[max(int(tail) - band, 0):int(tail) + band + 1]
+
+    # v and u are measured in standard deviations of the scenario returns: in plain returns they
+    # are far smaller than the weights, and SLSQP stalls on a linear objective over them
+    s = _state["scale"]
+    c = np.concatenate([-returns[deep].sum(axis=0) / tail, [s * (1 - len(deep) / tail)], np.full(len(edge), s / tail)])
+    J = np.hstack([returns[edge], s * np.ones((len(edge), 1)), s * np.eye(len(edge))])
+
+    v = np.quantile(-(returns @ weights), confidence, method="inverted_cdf")
+    x0 = np.concatenate([weights, [v / s], np.maximum(-(returns[edge] @ weights) - v, 0) / s])
+
+    return c, J, x0, [(None,None)] + [(0,None)]*len(edge)
+
+# Exact objective values (minimized sense) of one weight vector
+def evaluate(functions, weights):
+    return np.array([f(weights)[0] for f in functions])
+
+# One SLSQP solve over the simplex, with `bounds` for any variables after the weights
+# Returns the solution, or None
+def _minimize(f, x0, n, constraints=(), options=OPTIONS, bounds=()):
+    bounds = [(0,1)]*n + list(bounds)
+    budget = {'type':'eq', 'fun': lambda x: x[:n].sum()-1, 'jac': lambda x: np.append(np.ones(n), np.zeros(len(x) - n))}
+
+    constraints = [budget, *constraints]
+    result = minimize(f, x0, method='SLSQP', jac=True, options=options, bounds=bounds, constraints=constraints)
+    telemetry.solver("slsqp", result)
+    if result.success:
+        return result.x
+
+    # A line search that can no longer improve (status 8) stops where the normalized problem runs
+    # out of precision, often on flat stretches of a front; that iterate is kept if it is feasible
+    if result.status == 8:
+        violation = 0.0
+        for constraint in constraints:
+            values = np.atleast_1d(constraint['fun'](result.x))
+            violation = max(violation, np.max(np.abs(values) if constraint['type'] == 'eq' else -values))
+        if violation <= SLACK:
+            return result.x
+
+    return None
+
+# One HiGHS solve of the linear program with objective c and extra rows A x <= b
+# Returns (solution or None, whether the problem is infeasible)
+def _linear(c, A=None, b=None):
+    rows, A_ub, b_ub, A_eq, b_eq, bounds = _state["program"]
+    if A is not None:
+        A_ub, b_ub = sparse.vstack([A_ub, sparse.csr_matrix(A)], format='csr'), np.concatenate([b_ub, b])
+
+    result = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
+    telemetry.solver("highs", result)
+    if result.success:
+        return result.x[:_state["n"]], False
+
+    return None, result.status == 2
+
+# Solving one grid point from the weights of a neighbour
+# Objectives are normalized by the anchors' ideal and span
+# With CVaR, a solution the CVaR model does not match is solved again from there with a
+# wider band, up to the full Rockafellar-Uryasev program
+# Returns (weights or None, whether the point is proven infeasible)
+def _solvePoint(point, weights):
+    ideal, span, scheme, n = _state["ideal"], _state["span"], _state["scheme"], _state["n"]
+    names = _state["objectives"]
+
+    if _state["linear"]:
+        rows = _state["program"][0] / span[:, None]
+        if scheme == "weighted":
+            return _linear(np.asarray(point) @ rows)
+        return _linear(rows[0], rows[1:], np.asarray(point) + ideal[1:] / span[1:])
+
+    # The first objective's anchor minimizes it outright, so solves every point whose levels it meets
+    if scheme == "epsilon" and np.all(_state["payoff"][0, 1:] <= np.asarray(point) + FEASIBILITY):
+        return _state["anchors"][0], False
+
+    c = names.index("cvar") if "cvar" in names else None
+    band = BAND
+    while True:
+        functions, bounds, x0 = list(_state["functions"]), (), weights
+        if c is not None:
+            model, J, x0, bounds = _tailModel(weights, band)
+            functions[c] = lambda x, model=model: (model @ x, model)
+
+        def normalized(j):
+            def f(x):
+                value, grad = functions[j](x)
+                return (value - ideal[j]) / span[j], grad / span[j]
+            return f
+
+        scaled = [normalized(j) for j in range(len(functions))]
+
+        if scheme == "weighted":
+            def f(x):
+                value, grad = 0.0, 0.0
+                for weight, g in zip(point, scaled):
+                    if weight:
+                        v, d = g(x)
+                        value, grad = value + weight * v, grad + weight * d
+                return value, grad
+            constraints = []
+        else:
+            # epsilon: the first objective under levels on the others
+            f = scaled[0]
+            constraints = [
+                {'type':'ineq', 'fun': lambda x, g=g, level=level: level - g(x)[0], 'jac': lambda x, g=g: -g(x)[1]}
+                for g, level in zip(scaled[1:], point)
+            ]
+
+        if c is not None:
+            constraints.append({'type':'ineq', 'fun': lambda x, J=J: J @ x / span[c], 'jac': lambda x, J=J: J / span[c]})
+
+        x = _minimize(f, x0, n, constraints, bounds=bounds)
+        if x is None or c is None:
+            return (None if x is None else x[:n]), False
+
+        # The CVaR reached against the model's value (minimized) or the level (constrained);
+        # a zero weight leaves it free
+        value = (cvarValue(x[:n], _state["returns"], _state["confidence"])[0] - ideal[c]) / span[c]
+        if scheme == "weighted":
+            limit = scaled[c](x)[0] if point[c] else np.inf
+        else:
+            limit = point[c - 1]
+
+        if value <= limit + FEASIBILITY or band >= len(_state["returns"]):
+            return x[:n], False
+
+        weights, band = x[:n], 2 * band
+
+# Tangent-plane relaxation of an epsilon point that no anchor meets (Kelley's method)
+# Convex objectives lie above their tangent planes, so when no portfolio meets the levels on the
+# planes collected so far, the point is infeasible and HiGHS proves it; otherwise planes are added
+# at the relaxation's solution until that solution meets the true levels. Only the levels on
+# convex objectives are relaxed; leaving the others out still proves infeasibility.
+# Returns (whether the point is proven infeasible, weights meeting its convex levels or None)
+def _separate(point):
+    names, n, ideal, span = _state["objectives"], _state["n"], _state["ideal"], _state["span"]
+    convex = [j for j in range(1, len(names)) if names[j] in CONVEX]
+    if not convex:
+        return False, None
+
+    exact = _state["exact"]
+
+    # Normalized planes (j, g, b) with objective j >= g @ w + b, first taken at the anchors
+    if "planes" not in _state:
+        _state["planes"] = []
+        for weights in _state["anchors"]:
+            for j in convex:
+                value, grad = exact[j](weights)
+                _state["planes"].append((j, grad / span[j], (value - grad @ weights - ideal[j]) / span[j]))
+    planes = _state["planes"]
+
+    for _ in range(ROUNDS):
+        A = np.array([g for j, g, b in planes])
+        limits = np.array([point[j - 1] - b for j, g, b in planes])
+
+        result = linprog(np.zeros(n), A_ub=A, b_ub=limits, A_eq=np.ones((1, n)), b_eq=[1.0], bounds=(0, 1), method='highs')
+        telemetry.solver("highs", result)
+        if result.status == 2:
+            return True, None
+        if not result.success:
+            return False, None
+
+        weights, met = result.x, True
+        for j in convex:
+            value, grad = exact[j](weights)
+            if (value - ideal[j]) / span[j] > point[j - 1] + FEASIBILITY:
+                planes.append((j, grad / span[j], (value - grad @ weights - ideal[j]) / span[j]))
+                met = False
+        if met:
+            return False, weights
+
+    return False, None
+
+# Anchor closest to a grid point: the lowest weighted sum, or of the anchors meeting the
+# levels the lowest in the first objective (of the others, the least over the levels)
+# Returns (anchor index, whether the anchor meets the point's levels)
+def _closest(point):
+    payoff = _state["payoff"]
+    if _state["scheme"] == "weighted":
+        return int(np.argmin(payoff @ np.asarray(point))), True
+
+    excess = (payoff[:, 1:] - np.asarray(point)).max(axis=1)
+    if np.any(excess <= FEASIBILITY):
+        return int(np.argmin(np.where(excess <= FEASIBILITY, payoff[:, 0], np.inf))), True
+    return int(np.argmin(excess)), False
+
+# Solving a grid point again after its warm start failed
+# It is retried once, from the closest anchor; a point no anchor meets first goes through the
+# tangent-plane relaxation, which either proves it infeasible or supplies a start nearer its levels
+# Returns (weights or None, whether the point is proven infeasible)
+def _retry(point):
+    k, met = _closest(point)
+    weights = _state["anchors"][k]
+
+    if not met:
+        impossible, start = _separate(point)
+        if impossible:
+            return None, True
+        if start is not None:
+            weights = start
+
+    return _solvePoint(point, weights)
+
+# Solving one contiguous run of grid points (runs inside worker processes)
+# The run starts from the anchor closest to its first point and each later point from its
+# neighbour's solution; a point that fails is retried (see _retry) and otherwise yields NaN weights.
+# Only proven infeasibility marks a point infeasible, along with the points at least as tight on every level.
+def _frontChunk(task):
+    start, points = task
+
+    n = _state["n"]
+    if _state["linear"] and "program" not in _state:
+        _state["program"] = _program(_state)
+    if not _state["linear"] and "functions" not in _state:
+        _state["functions"] = _objectives(_state)
+        _state["exact"] = _exact(_state)
+
+    weights = _state["anchors"][_closest(points[0])[0]]
+
+    solved = np.full((len(points), n), np.nan)
+    infeasible = np.zeros(len(points), dtype=bool)
+    bounds = []
+    for i, point in enumerate(points):
+        if any(np.all(np.asarray(point) <= bound) for bound in bounds):
+            infeasible[i] = True
+            continue
+
+        result, impossible = _solvePoint(point, weights)
+        if result is None and not impossible and not _state["linear"]:
+            result, impossible = _retry(point)
+
+        if result is None:
+            if impossible:
+                infeasible[i] = True
+                bounds.append(np.asarray(point))
+            else:
+                logger.warning(f"PARETO POINT {start + i} FAILED")
+            continue
+
+        solved[i] = result
+        weights = result
+
+    return start, solved, infeasible
+
+# Pool initializer: receiving the shared inputs once per worker
+def _attach(inputs):
+    _state.update(inputs)
+
+# Grid of scalarization points, ordered so that consecutive points are neighbours
+# epsilon: levels on the non-primary objectives, from loose (1, the nadir) to tight (0, the ideal)
+# weighted: objective weights on the simplex
+def grid(m, points, scheme):
+    levels = np.linspace(1, 0, points)
+
+    if scheme == "epsilon":
+        if m == 2:
+            return [(level,) for level in levels]
+        # Boustrophedon order: each row is walked in the opposite direction to the previous one
+        return [(a, b) for i, a in enumerate(levels) for b in (levels if i % 2 == 0 else levels[::-1])]
+
+    steps = points - 1
+    if m == 2:
+        return [(k / steps, 1 - k / steps) for k in range(points)]
+
+    weights = []
+    for i in range(points):
+        row = range(steps - i + 1) if i % 2 == 0 else range(steps - i, -1, -1)
+        weights.extend((i / steps, j / steps, (steps - i - j) / steps) for j in row)
+    return weights
+
+# Non-dominated rows of an objective matrix (all minimized)
+# Values within tol count as equal; of equal rows only the first is kept
+def nonDominated(values, tol=1e-9):
+    values = np.asarray(values, dtype=float)
+    keep = ~np.isnan(values).any(axis=1)
+
+    for i in np.flatnonzero(keep):
+        others = keep.copy()
+        others[i] = False
+
+        noWorse = np.all(values[others] <= values[i] + tol, axis=1)
+        better = np.any(values[others] < values[i] - tol, axis=1)
+        duplicate = np.all(np.abs(values[others] - values[i]) <= tol, axis=1) & (np.flatnonzero(others) < i)
+
+        if np.any(noWorse & better) or np.any(duplicate):
+            keep[i] = False
+
+    return keep
+
+# Pareto front of `objectives` (two or three names from OBJECTIVES)
+# SIGMA: covariance, sigma: per-asset volatility (only used by "mdp"), returns: scenario matrix (T x n)
+# points is the number of levels (epsilon) or weight steps (weighted) per objective, so a three-objective
+# epsilon front solves up to points^2 problems; workers > 1 spreads them over a process pool (None = all cores)
+# confidence, fraction, theta and gamma are the CVaR, Kelly, ERM and CRRA parameters
+# Returns {"objectives", "weights": (K x n) non-dominated weights ordered by the first objective,
+#          "values": (K x m) objective values (risks as minimized, gains as maximized),
+#          "anchors": (m x n) single-objective optima, "ideal", "nadir",
+#          "solved": grid size, "infeasible": epsilon points proven out of reach, "failed": count}
+def pareto(objectives, SIGMA, sigma, returns, points=25, scheme="epsilon", workers=None, confidence=0.9, fraction=1, theta=0.3, gamma=3):
+
+    names = [name.lower() for name in objectives]
+    if len(names) not in (2, 3) or len(set(names)) != len(names):
+        logger.error("INVALID PARETO OBJECTIVES")
+        raise ValueError("A Pareto front needs two or three distinct objectives")
+    for name in names:
+        if name not in OBJECTIVES:
+            logger.error("INVALID PARETO OBJECTIVES")
+            raise ValueError(f"Invalid objective: {name}")
+    if scheme not in SCHEMES:
+        logger.error("INVALID PARETO SCHEME")
+        raise ValueError(f"Invalid scheme: {scheme}")
+    if points < 2:
+        raise ValueError("A Pareto front needs at least two points per objective")
+    if "cvar" in names and (confidence > 1 or confidence < 0):
+        logger.error("INVALID CVAR CONFIDENCE")
+        raise ValueError("Confidence is out of bounds (0,1)")
+
+    # Objectives in solving order
+    # SLSQP stalls minimizing a linear objective under a nonlinear level, so an epsilon front that
+    # lists return or CVaR first beside a smooth objective minimizes the first smooth one instead,
+    # holding the linear one under levels; the front is the same, spaced along the linear objective
+    linear = all(name in LINEAR for name in names)
+    order = list(range(len(names)))
+    if scheme == "epsilon" and not linear and names[0] in LINEAR:
+        first = next(j for j, name in enumerate(names) if name not in LINEAR)
+        order = [first] + [j for j in order if j != first]
+    back = np.argsort(order)
+
+    # Shared inputs, computed once
+    returns = np.ascontiguousarray(returns, dtype=float)
+    n = returns.shape[1]
+    inputs = {
+        "objectives": [names[j] for j in order], "n": n, "SIGMA": SIGMA, "sigma": sigma, "returns": returns,
+        "mean": returns.mean(axis=0), "scale": returns.std(), "confidence": confidence, "fraction": fraction,
+        "theta": theta, "gamma": gamma, "linear": linear
+    }
+    exact = _exact(inputs)
+
+    # Anchors: each objective minimized on its own, at the models' tolerance
+    # Return and CVaR are solved exactly as linear programs
+    logger.info(f"PARETO ANCHORS FOR {', '.join(name.upper() for name in names)}")
+    anchors = []
+    if any(name in LINEAR for name in names):
+        _state.update(inputs, program=_program(inputs))
+    try:
+        for j, (name, f) in enumerate(zip(inputs["objectives"], exact)):
+            if name in LINEAR:
+                x, _ = _linear(_state["program"][0][j])
+            else:
+                x = _minimize(f, np.ones(n) / n, n, options=models.SLSQP_OPTIONS)
+            if x is None:
+                logger.error("PARETO ANCHOR FAILED")
+                raise ValueError(f"Optimization of {name} alone failed")
+            anchors.append(x[:n])
+    finally:
+        _state.clear()
+
+    # Clipping the solver's bound tolerance so every weight set is a valid portfolio
+    anchors = np.clip(anchors, 0, None)
+    anchors /= anchors.sum(axis=1, keepdims=True)
+
+    payoff = np.array([evaluate(exact, weights) for weights in anchors])
+    ideal, nadir = payoff.min(axis=0), payoff.max(axis=0)
+    span = np.maximum(nadir - ideal, 1e-12)
+
+    inputs.update(scheme=scheme, ideal=ideal, span=span, anchors=anchors, payoff=(payoff - ideal) / span)
+
+    # Grid solves
+    scalarizations = grid(len(names), points, scheme)
+    workers = min(workers or os.cpu_count() or 1, len(scalarizations))
+    logger.info(f"PARETO FRONT OVER {len(scalarizations)} POINTS ON {workers} WORKERS")
+
+    if workers > 1:
+        edges = np.linspace(0, len(scalarizations), workers + 1).astype(int)
+        tasks = [(a, scalarizations[a:b]) for a, b in zip(edges[:-1], edges[1:])]
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(inputs,)) as pool:
+            parts = list(pool.map(_frontChunk, tasks))
+    else:
+        _state.update(inputs)
+        try:
+            parts = [_frontChunk((0, scalarizations))]
+        finally:
+            _state.clear()
+
+    parts = sorted(parts, key=lambda part: part[0])
+    solved = np.vstack([part[1] for part in parts])
+    infeasible = np.concatenate([part[2] for part in parts])
+    valid = ~np.isnan(solved).any(axis=1)
+
+    # Non-dominated set over the grid solutions and the anchors
+    candidates = np.clip(np.vstack([anchors, solved[valid]]), 0, None)
+    candidates /= candidates.sum(axis=1, keepdims=True)
+
+    values = np.array([evaluate(exact, weights) for weights in candidates])
+    keep = nonDominated((values - ideal) / span, tol=1e-7)
+
+    # Back in the order the objectives were given
+    values, ideal, nadir, anchors = values[:, back], ideal[back], nadir[back], anchors[back]
+
+    order = np.argsort(values[keep, 0], kind="stable")
+    front, values = candidates[keep][order], values[keep][order]
+
+    # Reporting gains as maximized
+    sense = np.array([-1.0 if name in MAXIMIZED else 1.0 for name in names])
+
+    logger.info(f"PARETO FRONT OF {len(front)} PORTFOLIOS")
+
+    return {
+        "objectives": names,
+        "weights": front,
+        "values": values * sense,
+        "anchors": anchors,
+        "ideal": ideal * sense,
+        "nadir": nadir * sense,
+        "solved": len(scalarizations),
+        "infeasible": int(infeasible.sum()),
+        "failed": int((~valid & ~infeasible).sum())
+    }
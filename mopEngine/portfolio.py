@@ -1,9 +1,19 @@
 # Modules
 import numpy as np
-import yfinance as yf
-from sklearn.covariance import LedoitWolf
-from tabulate import tabulate
+import pandas as pd
 import mopEngine.models as models
+import mopEngine.backtest as backtest
+import mopEngine.estimators as estimators
+import mopEngine.sweep as sweep
+import mopEngine.resample as resample
+import mopEngine.pareto as pareto
+from mopEngine.scenarios import ScenarioSet
+from mopEngine.prices import PriceStore
+import mopEngine.snapshot as snapshot
+import mopEngine.telemetry as telemetry
+from mopEngine.cache import fingerprint
+from mopEngine.blackLitterman import batchBLreturns
+from mopEngine.providers import YahooProvider, StaticMarketCaps, defaultMarketCaps, closeMatrix
 import pickle
 import os
 import logging
@@ -27,41 +37,305 @@ class Portfolio:
         pass
 
     # Caching essential values
-    def __init__(self, tickers, amount):
-        self.tickers = tickers
+    # Nothing is fetched or fitted here: history, returns, covariance and volatility
+    # are built on first access and cached (see the properties below)
+    # provider supplies price history (defaults to Yahoo Finance)
+    # marketCaps supplies Black-Litterman market caps (defaults to the shared cache)
+    # covariance selects the risk model: "ledoit-wolf" (dense) or "factor" (k-factor PCA, low-rank plus diagonal)
+    # window is the lookback, in price rows, used for covariance, volatility and scenarios
+    # cache is an optional cache.ResultCache (may be shared) memoizing Optimize results
+    # dtype is the storage type of close prices ("float32" halves their memory); returns are always float64
+    def __init__(self, tickers, amount, provider=None, marketCaps=None, covariance="ledoit-wolf", factors=10, window=100, cache=None, dtype="float64"):
+        self.cache = cache
+        self.dtype = np.dtype(dtype)
         self.amount = amount
-        self.weights = np.ones(len(tickers)) / len(tickers)
-        self.history = self.Fetch()
-        self.data = self.history.iloc[-100:]
-        self.covar = self.Covariance()
-
-    # Saving Portfolio to binary
+        self.provider = provider if provider is not None else YahooProvider()
+        self.marketCaps = marketCaps
+        self.tickers = tickers
+        self.window = window
+        self.covarianceModel = covariance
+        self.factors = factors
+
+        # Stage timings and solver statistics of the last Optimize / Sweep / Frontier / Performance / WalkForward call
+        self.stats = {}
+
+    # Dropping cached values so they are rebuilt on next access
+    # Dependencies: tickers -> prices -> returns -> covar, volatility
+    #               window, covariance model, factors -> covar (window also -> volatility)
+    # The rolling moments and data fingerprint go with the covariance
+    # Cached results are kept: their keys include the fingerprint, so they are only found again
+    # on the same data, and the cache's LRU bound ages them out
+    def _invalidate(self, *names):
+        for name in names + (("moments", "fingerprint") if "covar" in names else ()):
+            setattr(self, f"_{name}", None)
+
+    # Assets held
+    # Changing them drops all market data and resets to equal weights
+    @property
+    def tickers(self):
+        return self._tickers
+
+    @tickers.setter
+    def tickers(self, value):
+        self._tickers = value
+        self.weights = np.ones(len(value)) / len(value)
+        self._invalidate("prices", "returns", "logreturns", "covar", "volatility")
+
+    # Lookback window in price rows
+    @property
+    def window(self):
+        return self._window
+
+    @window.setter
+    def window(self, value):
+        self._window = int(value)
+        self._invalidate("covar", "volatility")
+
+    # Covariance model and its factor count
+    @property
+    def covarianceModel(self):
+        return self._covarianceModel
+
+    @covarianceModel.setter
+    def covarianceModel(self, value):
+        if value not in estimators.COVARIANCE_MODELS:
+            raise self.PortfolioError(f"Invalid covariance model: {value}")
+        self._covarianceModel = value
+        self._invalidate("covar")
+
+    @property
+    def factors(self):
+        return self._factors
+
+    @factors.setter
+    def factors(self, value):
+        self._factors = value
+        self._invalidate("covar")
+
+    # Close prices (prices.PriceStore), fetched on first access
+    # Replacing them drops everything derived from them
+    @property
+    def prices(self):
+        if self._prices is None:
+            self._prices = PriceStore.FromFrame(self.Fetch(), self.tickers, self.dtype)
+        return self._prices
+
+    @prices.setter
+    def prices(self, value):
+        self._prices = value
+        self._invalidate("returns", "logreturns", "covar", "volatility")
+
+    # Price history as a frame with (ticker, "Close") columns, a view of the price store
+    # Assigning a provider frame keeps its closes only
+    @property
+    def history(self):
+        return self.prices.Frame()
+
+    @history.setter
+    def history(self, value):
+        self.prices = PriceStore.FromFrame(value, self.tickers, self.dtype)
+
+    # Most recent window of price history (a view, not a copy)
+    @property
+    def data(self):
+        return self.prices.Window(self.window).Frame()
+
+    # Number of return rows in the lookback window
+    @property
+    def lookback(self):
+        return min(self.window, len(self.prices)) - 1
+
+    # Aligned simple returns (dates x tickers), built once per data refresh
+    @property
+    def returns(self):
+        if self._returns is None:
+            self.Returns()
+        return self._returns
+
+    # Aligned log returns (dates x tickers), built once per data refresh
+    @property
+    def logreturns(self):
+        if self._logreturns is None:
+            self.Returns()
+        return self._logreturns
+
+    # Covariance over the lookback window, fitted on first access
+    # May be assigned directly (e.g. an externally estimated matrix)
+    @property
+    def covar(self):
+        if self._covar is None:
+            self._covar = self.Covariance()
+        return self._covar
+
+    @covar.setter
+    def covar(self, value):
+        self._invalidate("covar")
+        self._covar = value
+
+    # Daily per-asset volatility (standard deviation of log returns) over the lookback window, computed on first access
+    @property
+    def volatility(self):
+        if self._volatility is None:
+            self._volatility = self.Volatility()
+        return self._volatility
+
+    # Fingerprint of the data every optimization depends on (result cache key)
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = fingerprint(list(self.tickers), self.window, self.returns, self.covar)
+        return self._fingerprint
+
+    # Dropping the price history so the next access downloads it again
+    def Refresh(self):
+        self._prices = None
+        self._invalidate("returns", "logreturns", "covar", "volatility")
+
+    # Appending new price bars without refetching
+    # bars is a provider frame with (ticker, "Close") columns, or a dates x tickers close frame.
+    # Bars after the current history are appended to the price store and extend the return
+    # matrices, and a Ledoit-Wolf
+    # covariance is rolled forward over the lookback window at O(n^2) per bar
+    # (estimators.RollingMoments); other covariance models are refitted on next access.
+    # Bars revising dates already held rebuild everything from the merged history.
+    @telemetry.recorded
+    def Update(self, bars):
+
+        logger.info("UPDATING DATA")
+
+        if not isinstance(bars.columns, pd.MultiIndex):
+            bars = bars.set_axis(pd.MultiIndex.from_tuples([(ticker, "Close") for ticker in bars.columns]), axis=1)
+        bars = bars.sort_index()
+        if bars.empty:
+            return
+
+        dates, closes = closeMatrix(bars, self.tickers)
+        dates = dates.values.astype("datetime64[ns]")
+        prices = self.prices
+
+        if len(prices) and dates[0] <= prices.dates[-1]:
+            self.prices = prices.Merge(dates, closes)
+            return
+
+        oldWindow = self.lookback
+        returns, logreturns, covar, moments = self._returns, self._logreturns, self._covar, self._moments
+
+        # New return rows, starting from the last close held
+        with telemetry.stage("returns"):
+            closes = np.vstack([prices.closes[-1:], closes]).astype(float)
+            rows = closes[1:] / closes[:-1] - 1
+            rows = rows[~np.isnan(rows).any(axis=1)]
+
+        prices.Append(dates, closes[1:])
+        self._invalidate("covar", "volatility")
+
+        # Return matrices not built yet are built from the full history on first access
+        if returns is None:
+            return
+
+        self._returns = np.concatenate([returns, rows])
+        self._logreturns = np.concatenate([logreturns, np.log1p(rows)])
+
+        if covar is None or self.covarianceModel != "ledoit-wolf":
+            return
+
+        # Rows leaving and entering the covariance window
+        window = self.lookback
+        oldStart = max(0, len(returns) - oldWindow)
+        newStart = max(0, len(self._returns) - window)
+
+        with telemetry.stage("covariance", model=self.covarianceModel):
+            if newStart > len(returns) or (moments is not None and moments.updates > 10 * window):
+                # Whole window replaced, or rounding accumulated over many updates: starting over
+                moments = estimators.RollingMoments(self._returns[newStart:])
+            else:
+                if moments is None:
+                    moments = estimators.RollingMoments(returns[oldStart:])
+                if newStart > oldStart:
+                    moments.Remove(self._returns[oldStart:newStart])
+                if len(rows):
+                    moments.Add(rows)
+
+            self._moments = moments
+            self._covar = moments.LedoitWolf()
+
+    # Saving Portfolio to a snapshot (see snapshot.py)
+    # Stores the price history, return matrices, covariance and weights so Load needs no network
     @classmethod
     def Save(cls, portfolio_instance, name):
 
         logger.info(f"Saving portfolio to {name}.folio")
 
-        portfolio_data = {"tickers":portfolio_instance.tickers, "weights":portfolio_instance.weights, "amount":portfolio_instance.amount}
-        os.makedirs('portfolios', exist_ok=True)
+        prices = portfolio_instance.prices
 
-        with open(f"portfolios/{name}.folio", 'wb') as file:
-            pickle.dump(portfolio_data, file)
-    
-    # Loading portfolio from binary
+        arrays = {
+            "dates": prices.dates,
+            "closes": prices.closes,
+            "returns": portfolio_instance.returns,
+            "logreturns": portfolio_instance.logreturns,
+            "weights": portfolio_instance.weights
+        }
+
+        # Factor covariances are stored as their factors
+        covar = portfolio_instance.covar
+        if isinstance(covar, estimators.FactorCovariance):
+            arrays["loadings"], arrays["specific"] = covar.loadings, covar.specific
+        else:
+            arrays["covar"] = covar
+
+        meta = {
+            "tickers": list(portfolio_instance.tickers),
+            "amount": portfolio_instance.amount,
+            "covariance": portfolio_instance.covarianceModel,
+            "factors": portfolio_instance.factors,
+            "window": portfolio_instance.window,
+            "dtype": str(portfolio_instance.dtype)
+        }
+
+        snapshot.save(os.path.join("portfolios", f"{name}.folio"), meta, arrays)
+
+    # Loading portfolio from a snapshot
+    # Arrays are memory-mapped (mmap=True) and nothing is fetched;
+    # refresh=True rebuilds the portfolio from fresh provider data and only keeps the saved weights.
+    # Files written by earlier versions (pickled tickers, weights and amount) are always refreshed.
     @classmethod
-    def Load(cls, name):
+    def Load(cls, name, provider=None, marketCaps=None, refresh=False, mmap=True, cache=None):
 
         logger.info(f"Loading portfolio from {name}.folio")
 
-        with open(f"portfolios/{name}.folio", 'rb') as file:
-            portfolio_data = pickle.load(file)
+        path = os.path.join("portfolios", f"{name}.folio")
+
+        if os.path.isfile(path):
+            with open(path, 'rb') as file:
+                portfolio_data = pickle.load(file)
+
+            loadedPortfolio = cls(portfolio_data["tickers"], portfolio_data["amount"], provider, marketCaps, cache=cache)
+            loadedPortfolio.weights = portfolio_data["weights"]
+            return loadedPortfolio
+
+        try:
+            meta, arrays = snapshot.load(path, mmap)
+        except snapshot.SnapshotError as e:
+            raise cls.PortfolioError(str(e))
+
+        # Construction fetches nothing; the saved data is installed before first access
+        dtype = meta.get("dtype", "float64")
+        loadedPortfolio = cls(meta["tickers"], meta["amount"], provider, marketCaps, meta["covariance"], meta["factors"], meta["window"], cache, dtype)
+        loadedPortfolio.weights = np.array(arrays["weights"])
+
+        if refresh:
+            return loadedPortfolio
 
-        tickers = portfolio_data["tickers"]
-        weights = portfolio_data["weights"]
-        amount = portfolio_data["amount"]
+        loadedPortfolio.prices = PriceStore(arrays["dates"], arrays["closes"], meta["tickers"], dtype)
 
-        loadedPortfolio = cls(tickers, amount)
-        loadedPortfolio.weights = weights
+        # Set after prices, whose setter drops cached returns and covariance
+        loadedPortfolio._returns = arrays["returns"]
+        loadedPortfolio._logreturns = arrays["logreturns"]
+
+        if "covar" in arrays:
+            loadedPortfolio.covar = arrays["covar"]
+        else:
+            loadedPortfolio.covar = estimators.FactorCovariance(arrays["loadings"], arrays["specific"])
 
         return loadedPortfolio
     
@@ -72,11 +346,12 @@ class Portfolio:
 
         # If data is empty or some other error
         try:
-            data = yf.download(tickers=self.tickers, period=f"{period}d", group_by="ticker", auto_adjust=True)
+            with telemetry.stage("fetch"):
+                data = self.provider.Download(self.tickers, period=period)
             
             if data.empty:
                 logger.warning("FETCH FAILED")
-                raise self.PortfolioError("No data returned from yfinance")
+                raise self.PortfolioError("No data returned from provider")
 
             logger.info("FETCH SUCCESSFUL")
             return data
@@ -85,42 +360,67 @@ class Portfolio:
             logger.exception("FETCH FAILED")
             raise self.PortfolioError(f"Failed to fetch data due to an underlying error: {e}")
 
+    # Building aligned return matrices from close prices
+    def Returns(self):
+
+        logger.info("BUILDING RETURNS")
+
+        # Prices are fetched (if needed) outside the returns stage
+        prices = self.prices
+
+        with telemetry.stage("returns"):
+            # Dates where any asset is missing are dropped so rows stay aligned
+            _, self._returns = prices.Returns()
+            self._logreturns = np.log1p(self._returns)
+
     # Computing covariance
     def Covariance(self):
         
         logger.info("COMPUTING COVARIANCE")
 
-        returnMatrix = []
-        for ticker in self.tickers:
-            asset = self.data[ticker]["Close"].pct_change(fill_method=None).dropna().values
-            returnMatrix.append(asset)
+        # Returns over the recent window
+        trimmed = self.returns[-self.lookback:]
 
-        min_len = min(len(r) for r in returnMatrix)
-        trimmed = np.array([r[-min_len:] for r in returnMatrix]).T
-        
-        LW = LedoitWolf().fit(trimmed)
-        return LW.covariance_ 
+        with telemetry.stage("covariance", model=self.covarianceModel):
+            return estimators.covariance(trimmed, self.covarianceModel, self.factors)
 
     # Computing volatility per asset
     def Volatility(self):
-        volvector = []
-        for ticker in self.tickers:
-            asset = self.data[ticker]["Close"]
-            logreturns = np.log(asset / asset.shift(1)).dropna()
-            volvector.append(round(logreturns.std(), 5))
-        
-        return np.array(volvector)
+        trimmed = self.logreturns[-self.lookback:]
+
+        with telemetry.stage("volatility"):
+            return estimators.volatility(trimmed)
     
     # Returning stats of the portfolio as a table
     def Stats(self):
+        from tabulate import tabulate
+
         table = []
         for ticker, weight in zip(self.tickers, self.weights):
             table.append([ticker, round(weight, 3), round(weight*self.amount, 2)])
         
         return tabulate(table, headers=["STOCK", "WEIGHT", "AMOUNT"], tablefmt='plain')
 
+    # Raising PortfolioError unless method is one of models.OPTIMIZERS
+    def _checkMethod(self, method):
+        if method.lower() not in models.OPTIMIZERS:
+            logger.error("INVALID OPTIMIZER")
+            raise self.PortfolioError(f"Invalid Optimizer method: {method}")
+
+    # Market caps of the tickers, resolved now, as a fixed source for mean-variance solves
+    # (so repeated solves, cache keys and worker processes do not look them up again)
+    # None for every other method
+    def _staticCaps(self, method):
+        if method.lower() != "mean-variance":
+            return None
+
+        source = self.marketCaps if self.marketCaps is not None else defaultMarketCaps
+        with telemetry.stage("marketcaps"):
+            return StaticMarketCaps(source.MarketCaps(self.tickers))
+
     # Optimize function to optimize using a valid optimizer
     # Optimizers to date: Variance, MDP, MVO, CVaR, Mean-CVaR
+    @telemetry.recorded
     def Optimize(
             self, 
             method="variance", 
@@ -134,104 +434,277 @@ class Portfolio:
             tauBL=0.025,
             fraction=1,
             theta=0.3,
-            gamma=3
+            gamma=3,
+            solver="slsqp",
+            scenarios=None,
+            warm=False
         ):
 
         tickers_length = len(self.tickers)
 
-        # If A single Black-Litterman matrix is skipped, the entire view framework is defaulted
-        # Black-Litterman will be calculated without views. i.e. Market Implied Returns
-        if p is None or q is None or omega is None:
-            p, q, omega = np.zeros(tickers_length), np.zeros(tickers_length), np.zeros(tickers_length)
+        # Checking if optimizer is valid
+        self._checkMethod(method)
         
         # Resetting weights to prevent false convergence
+        # unless warm, when the solve starts from the current allocation (e.g. after Update)
         tempweights = np.ones(tickers_length) / tickers_length
-
-        # Available Optimizers dictionary
-        optimizers = {
-            "variance":[models.Variance, [tempweights, self.covar*time]],
-            "mdp":[models.MDP, [tempweights, self.covar*time, self.Volatility()*np.sqrt(time)]],
-            "mean-variance":[models.MVO, [tempweights, self.covar*time, risk, self.tickers, p, q, omega, lambdaBL, tauBL]],
-            "cvar":[models.CVaR, [tempweights, self.tickers, confidence, self.history]],
-            "mean-cvar":[models.MCVaR, [tempweights, self.tickers, confidence, self.history]],
-            "kelly": [models.Kelly, [tempweights, fraction, self.tickers, self.history]],
-            "erm": [models.ERM, [tempweights, theta, self.tickers, self.history]],
-            "crra": [models.CRRA, [tempweights, gamma, self.tickers, self.history]]
+        if warm and self.weights is not None and len(self.weights) == tickers_length and np.all(np.isfinite(self.weights)):
+            tempweights = np.array(self.weights, dtype=float)
+
+        # Scenario models run on simulated scenarios when given, historical returns otherwise
+        returns = self.returns if scenarios is None else scenarios
+
+        # Cached results are keyed on the data fingerprint plus every solve input
+        # Market caps are resolved up front so the key covers them too
+        marketCaps = self.marketCaps
+        if self.cache is not None:
+            caps = None
+            static = self._staticCaps(method)
+            if static is not None:
+                marketCaps, caps = static, static.caps
+
+            key = self.cache.Key(self.fingerprint, fingerprint(
+                method.lower(), risk, time, p, q, omega, confidence, lambdaBL, tauBL,
+                fraction, theta, gamma, solver, scenarios, caps
+            ))
+
+            weights = self.cache.Get(key)
+            if weights is not None:
+                self.weights = weights
+                return
+
+        # Asset volatility is only needed by MDP
+        volatility = self.volatility if method.lower() == "mdp" else None
+
+        self.weights = models.Solve(
+            method, tempweights, self.covar, volatility, returns, self.tickers,
+            risk=risk, time=time, p=p, q=q, omega=omega, confidence=confidence,
+            lambdaBL=lambdaBL, tauBL=tauBL, fraction=fraction, theta=theta, gamma=gamma,
+            solver=solver, marketCaps=marketCaps
+        )
+
+        if self.cache is not None and self.weights is not None:
+            self.cache.Put(key, self.weights)
+
+    # Simulated scenarios for the scenario models, calibrated on the lookback window
+    # Pass the result to Optimize(scenarios=...) to solve CVaR, Mean-CVaR, Kelly, CRRA or ERM
+    # over far more scenarios than fit in memory (see scenarios.ScenarioSet)
+    def Scenarios(self, count=1_000_000, kind="normal", df=5, chunk=100_000, seed=0, memory=512 * 2**20):
+        return ScenarioSet(
+            self.returns[-self.lookback:], count=count, kind=kind, covariance=self.covar,
+            df=df, chunk=chunk, seed=seed, memory=memory
+        )
+
+    # Black-Litterman posterior returns for many view sets against this portfolio's prior
+    # views is a sequence of (P, Q, OMEGA); market caps are fetched and the prior built once
+    # Returns a DataFrame with one row of posterior returns per view set
+    @telemetry.recorded
+    def Views(self, views, lambdaBL=2.5, tauBL=0.025):
+        posterior = batchBLreturns(self.tickers, self.covar, views, lam=lambdaBL, TAU=tauBL, marketCaps=self.marketCaps)
+        return pd.DataFrame(posterior, columns=self.tickers)
+
+    # Solving one method over a grid of parameter values
+    # param is one of sweep.SWEEPABLE (risk, confidence, gamma, theta, fraction, ...)
+    # Each solve is warm-started from its neighbour; workers > 1 splits the grid across processes
+    # Extra keyword arguments are passed to every solve
+    # Returns {"values", "weights" (K x n), "risk", "return"} with daily volatility and mean return per point,
+    # both over the lookback window
+    @telemetry.recorded
+    def Sweep(self, method, param, values, warm=True, workers=1, **params):
+
+        self._checkMethod(method)
+        if param not in sweep.SWEEPABLE:
+            logger.error("INVALID SWEEP PARAMETER")
+            raise self.PortfolioError(f"Invalid sweep parameter: {param}")
+
+        # Market caps are resolved once rather than per point (and per worker)
+        caps = self._staticCaps(method)
+        if caps is not None:
+            params["marketCaps"] = caps
+
+        volatility = self.volatility if method.lower() == "mdp" else None
+        weights = sweep.sweep(method, param, values, self.covar, volatility, self.returns, self.tickers, warm=warm, workers=workers, **params)
+
+        return {
+            "values": np.asarray(values),
+            "weights": weights,
+            "risk": np.sqrt(np.sum(weights * (self.covar @ weights.T).T, axis=1)),
+            "return": weights @ self.returns[-self.lookback:].mean(axis=0)
         }
 
-        # Checking if optimizer is valid
-        if method.lower() in optimizers:
-            function, args = optimizers[method.lower()]
-            self.weights = function(*args)
-        
-        else:
-            logger.error("INVALID OPTIMIZER")
-            raise self.PortfolioError(f"Invalid Optimizer method: {method}")
+    # Mean-variance efficient frontier
+    # Sweeps the MVO risk aversion over `risks` (log-spaced from 0.1 to 1000 by default)
+    @telemetry.recorded
+    def Frontier(self, risks=None, points=20, warm=True, workers=1, **params):
+        if risks is None:
+            risks = np.logspace(-1, 3, points)
+
+        return self.Sweep("mean-variance", "risk", risks, warm=warm, workers=workers, **params)
+
+    # Resampled optimization: the method re-solved on `draws` bootstrap resamples of the returns
+    # and the solutions averaged (see resample.resample); the averaged weights become the portfolio's
+    # Draws are spread over `workers` processes (None = all cores) and are reproducible for a given seed
+    # Extra keyword arguments are the Optimize parameters (risk, confidence, gamma, p, q, omega, ...)
+    # Returns {"weights", "std", "lower", "upper", "draws", "failed"}
+    @telemetry.recorded
+    def Resample(self, method="variance", draws=500, workers=None, seed=0, **params):
+
+        self._checkMethod(method)
+
+        # Market caps are resolved once rather than per draw (and per worker)
+        caps = self._staticCaps(method)
+        if caps is not None:
+            params["marketCaps"] = caps
+
+        with telemetry.stage("resample", method=method.lower(), draws=draws):
+            try:
+                result = resample.resample(
+                    method, self.returns, self.tickers, draws=draws, window=self.lookback, workers=workers, seed=seed,
+                    covariance=self.covarianceModel, factors=self.factors, **params
+                )
+            except ValueError as e:
+                raise self.PortfolioError(str(e))
+
+        self.weights = result["weights"]
+        return result
+
+    # Pareto front of two or three objectives ("variance", "return", "cvar", "mdp", "kelly", "erm", "crra")
+    # scheme "epsilon" bounds the later objectives at evenly spaced levels, "weighted" blends them
+    # (see pareto.pareto); points are spread over `workers` processes (None = all cores)
+    # The portfolio's weights are left unchanged
+    # Returns {"objectives", "weights", "values", "anchors", "ideal", "nadir", "solved", "infeasible", "failed"}
+    @telemetry.recorded
+    def Pareto(self, objectives=("variance", "return"), points=25, scheme="epsilon", workers=None, confidence=0.9, fraction=1, theta=0.3, gamma=3):
+
+        names = [name.lower() for name in objectives]
+
+        # Covariance and volatility are only fitted when an objective needs them
+        SIGMA = self.covar if "variance" in names or "mdp" in names else None
+        volatility = self.volatility if "mdp" in names else None
+
+        with telemetry.stage("pareto", objectives=names, points=points):
+            try:
+                return pareto.pareto(
+                    objectives, SIGMA, volatility, self.returns, points=points, scheme=scheme, workers=workers,
+                    confidence=confidence, fraction=fraction, theta=theta, gamma=gamma
+                )
+            except ValueError as e:
+                raise self.PortfolioError(str(e))
 
     # Portfolio Performance Analysis 
-    def Performance(self, start_date="2017-01-01", end_date="2018-01-01", cost=0):
+    # weights defaults to the portfolio's own weights
+    # A (K x n) stack of weight vectors is backtested in one pass over data fetched once,
+    # returning one list of (metric, value) pairs per row
+    @telemetry.recorded
+    def Performance(self, start_date="2017-01-01", end_date="2018-01-01", cost=0, weights=None):
         # Fetching Data
         try:
             logger.info("INITIATING PORTFOLIO BACKTEST")
             logger.info("FETCHING BACKTEST DATA")
-            closes = yf.download(tickers=self.tickers, start=start_date, end=end_date, group_by="ticker", auto_adjust=True)
+            with telemetry.stage("fetch"):
+                closes = self.provider.Download(self.tickers, start=start_date, end=end_date)
             
             if closes.empty:
                 logger.warning("FETCH FAILED")
-                raise self.PortfolioError("No data returned from yfinance")
+                raise self.PortfolioError("No data returned from provider")
             logger.info("FETCH SUCCESSFUL")
 
-            # Truncating to level data
-            closes = closes.loc[:, (slice(None), "Close")]
+            # Truncating to level data, in portfolio ticker order
+            closes = closes.loc[:, [(ticker, "Close") for ticker in self.tickers]]
             closes.columns = closes.columns.get_level_values(0)
             equityReturns = closes.pct_change(fill_method=None).dropna().values
 
-            # Computing portfolio returns
-            portfolioReturns = []
-            T = len(equityReturns)
-            for t in range(T):
-                if t != 0:
-                    rweights = self.weights * (1 + equityReturns[t-1])
-                    rweights /= rweights.sum()
-
-                    turnover = np.sum(np.abs(self.weights - rweights))
-                    slippage = cost * turnover
-                else:
-                    slippage = 0
-
-                portfolioReturn = self.weights @ equityReturns[t] - slippage
-                portfolioReturns.append(portfolioReturn)
-
-            # Caching repeated or risky values
-            portfolioReturns = np.array(portfolioReturns)
-            portfolioAvg = portfolioReturns.mean()
-            downsideSTD = portfolioReturns[portfolioReturns < 0].std()
-
-            # Metrics to be displayed
-            SHARPE = np.sqrt(252) * portfolioAvg / portfolioReturns.std()
-            SORTINO = np.sqrt(252) * portfolioAvg / downsideSTD if downsideSTD > 0 else np.nan
-            VOLATILITY = portfolioReturns.std() * np.sqrt(252)
-            AVERAGE = portfolioAvg
-            TOTAL = np.prod(1 + portfolioReturns) - 1
-            CAGR = (1+TOTAL) ** (252/T) - 1
-
-            # Metrics and Corresponding values
-            metrics = [
-                'Sharpe Ratio',
-                'Sortino Ratio',
-                'Volatility',
-                'Mean Return',
-                'Total Return',
-                'CAGR'
-            ]
-            values = [VOLATILITY, AVERAGE, TOTAL, CAGR]
-            results = [round(SHARPE, 2), round(SORTINO, 2)] + [f"{round(x*100, 2)}%" for x in values]
+            # Computing metrics for every weight vector at once
+            batch = weights is not None and np.ndim(weights) == 2
+            stack = np.atleast_2d(self.weights if weights is None else weights)
+            values = backtest.backtest(equityReturns, stack, cost)
+
+            results = [self._metricTable(values, k) for k in range(len(stack))]
 
             logger.info("BACKTEST SUCCESSFUL")
 
             # Returning in table format
-            return (zip(metrics, results))
+            return results if batch else zip(backtest.METRICS, [value for _, value in results[0]])
         
         except Exception as e:
             logger.exception("FETCH FAILED")
             raise self.PortfolioError(f"Failed to fetch data due to an underlying error: {e}")
+
+    # (metric, value) pairs of the k-th portfolio: ratios are rounded, the rest shown as percentages
+    @staticmethod
+    def _metricTable(values, k=0):
+        row = [round(values[m][k], 2) for m in backtest.METRICS[:2]]
+        row += [f"{round(values[m][k]*100, 2)}%" for m in backtest.METRICS[2:]]
+        return list(zip(backtest.METRICS, row))
+
+    # Backtest over return data too large for memory
+    # source is a (T x n) equity return matrix in portfolio ticker order: a .npy path (memory-mapped),
+    # an array or np.memmap, or an iterable of (rows x n) chunks (e.g. a generator reading a feed)
+    # Returns are consumed `rows` at a time with constant-memory running metrics (backtest.streamBacktest);
+    # periods is the number of return rows per year (252 for daily, 252 * 390 for minute bars).
+    # weights works as in Performance
+    @telemetry.recorded
+    def StreamPerformance(self, source, rows=100_000, cost=0, weights=None, periods=252):
+        logger.info("INITIATING STREAMING BACKTEST")
+
+        stream = backtest.chunks(source, rows) if isinstance(source, (str, os.PathLike, np.ndarray)) else source
+
+        batch = weights is not None and np.ndim(weights) == 2
+        stack = np.atleast_2d(self.weights if weights is None else weights)
+        values = backtest.streamBacktest(stream, stack, cost, periods)
+
+        logger.info("BACKTEST SUCCESSFUL")
+
+        results = [self._metricTable(values, k) for k in range(len(stack))]
+        return results if batch else results[0]
+
+    # Walk-forward rebalancing backtest
+    # Every `rebalance` trading days from start_date the method is re-optimized on the
+    # trailing `window` days of returns and held until the next rebalance.
+    # Window optimizations run on a process pool of `workers` (None = all cores)
+    # Extra keyword arguments are the Optimize parameters (risk, confidence, gamma, ...)
+    # Returns {"metrics": [(metric, value)], "weights": rebalance weights, "returns": daily returns}
+    @telemetry.recorded
+    def WalkForward(self, method="variance", start_date="2017-01-01", end_date="2018-01-01", window=100, rebalance=21, cost=0, workers=None, **params):
+
+        self._checkMethod(method)
+
+        try:
+            logger.info("INITIATING WALK-FORWARD BACKTEST")
+
+            # Fetching enough extra calendar days to fill the first window
+            lookback = pd.Timestamp(start_date) - pd.Timedelta(days=int(window * 1.6) + 10)
+            with telemetry.stage("fetch"):
+                closes = self.provider.Download(self.tickers, start=lookback, end=end_date)
+
+            if closes.empty:
+                logger.warning("FETCH FAILED")
+                raise self.PortfolioError("No data returned from provider")
+            logger.info("FETCH SUCCESSFUL")
+
+            dates, returns = PriceStore.FromFrame(closes, self.tickers).Returns()
+
+            # Market caps are resolved once here rather than in every worker
+            caps = self._staticCaps(method)
+            if caps is not None:
+                params["marketCaps"] = caps
+
+            with telemetry.stage("backtest", method=method.lower()):
+                result = backtest.walkForward(
+                    dates, returns, self.tickers, method, start=start_date, window=window, rebalance=rebalance, cost=cost, workers=workers,
+                    covariance=self.covarianceModel, factors=self.factors, **params
+                )
+
+        except self.PortfolioError:
+            raise
+        except Exception as e:
+            logger.exception("WALK-FORWARD FAILED")
+            raise self.PortfolioError(f"Walk-forward backtest failed due to an underlying error: {e}")
+
+        logger.info("WALK-FORWARD SUCCESSFUL")
+
+        return {
+            "metrics": self._metricTable(result["metrics"]),
+            "weights": pd.DataFrame(result["weights"], index=pd.DatetimeIndex(result["rebalances"]), columns=self.tickers),
+            "returns": pd.Series(result["returns"], index=pd.DatetimeIndex(result["dates"]))
+        }
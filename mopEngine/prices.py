@@ -0,0 +1,145 @@
+import numpy as np
+import logging
+
+# Logging system
+# Taking config from root
+logger = logging.getLogger(__name__)
+
+# Close-only price store
+# Holds one (dates x tickers) close matrix on a single sorted calendar, in ticker order,
+# as float64 or float32. Provider frames carry full OHLCV; only closes are kept.
+#
+# Rows live in a buffer with spare capacity so Append is amortized O(new rows).
+# closes, dates and Window() are views into that buffer, never copies: appends only write
+# past the rows already held, so views handed out earlier stay valid and unchanged.
+# pandas is only needed to convert from and to frames.
+class PriceStore:
+
+    def __init__(self, dates, closes, tickers, dtype=np.float64):
+        closes = np.asarray(closes)
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+
+        if closes.ndim != 2 or closes.shape != (len(dates), len(tickers)):
+            raise ValueError(f"Close matrix of shape {closes.shape} does not match {len(dates)} dates x {len(tickers)} tickers")
+
+        self.tickers = list(tickers)
+        self.dtype = np.dtype(dtype)
+
+        # Memory-mapped or already typed arrays are kept as they are
+        self._closes = closes if closes.dtype == self.dtype else closes.astype(self.dtype)
+        self._dates = dates
+        self._length = len(dates)
+
+    # Building a store from a provider frame with (ticker, "Close") columns
+    # Dates are sorted, duplicates keep the last bar, and dates where no ticker traded are dropped
+    @classmethod
+    def FromFrame(cls, frame, tickers, dtype=np.float64):
+        closes = frame.loc[:, [(ticker, "Close") for ticker in tickers]].to_numpy(dtype=dtype)
+        dates = frame.index.values.astype("datetime64[ns]")
+
+        if len(dates) and not np.all(dates[1:] > dates[:-1]):
+            order = np.argsort(dates, kind="stable")
+            dates, closes = dates[order], closes[order]
+
+            # Keeping the last of each run of equal dates
+            last = np.append(dates[1:] != dates[:-1], True)
+            dates, closes = dates[last], closes[last]
+
+        traded = ~np.isnan(closes).all(axis=1)
+        if not traded.all():
+            dates, closes = dates[traded], closes[traded]
+
+        return cls(dates, np.ascontiguousarray(closes), tickers, dtype)
+
+    def __len__(self):
+        return self._length
+
+    # Close matrix (dates x tickers), a view of the rows held
+    @property
+    def closes(self):
+        return self._closes[:self._length]
+
+    @property
+    def dates(self):
+        return self._dates[:self._length]
+
+    @property
+    def nbytes(self):
+        return self.closes.nbytes + self.dates.nbytes
+
+    # Most recent `rows` rows as a store sharing this one's memory
+    def Window(self, rows):
+        start = max(0, self._length - rows)
+        return PriceStore(self._dates[start:self._length], self._closes[start:self._length], self.tickers, self.dtype)
+
+    # Store of a subset of tickers, on the dates where at least one of them traded
+    def Select(self, tickers):
+        missing = [ticker for ticker in tickers if ticker not in self.tickers]
+        if missing:
+            raise ValueError(f"No prices for {', '.join(missing)}")
+
+        columns = [self.tickers.index(ticker) for ticker in tickers]
+        closes = self.closes[:, columns]
+
+        traded = ~np.isnan(closes).all(axis=1)
+        return PriceStore(self.dates[traded], np.ascontiguousarray(closes[traded]), tickers, self.dtype)
+
+    # Aligned simple returns and the dates they end on
+    # Rows where any ticker has no close on either side are dropped so every row covers all tickers
+    # Closes are widened to float64 before dividing, so float32 storage does not cost return precision
+    def Returns(self):
+        closes = self.closes.astype(np.float64, copy=False)
+        returns = closes[1:] / closes[:-1] - 1
+
+        valid = ~np.isnan(returns).any(axis=1)
+        if valid.all():
+            return self.dates[1:], returns
+        return self.dates[1:][valid], np.ascontiguousarray(returns[valid])
+
+    # Adding rows dated after the last one held
+    def Append(self, dates, closes):
+        dates = np.asarray(dates, dtype="datetime64[ns]")
+        closes = np.asarray(closes, dtype=self.dtype).reshape(len(dates), len(self.tickers))
+        if not len(dates):
+            return
+
+        if self._length and dates[0] <= self._dates[self._length - 1]:
+            raise ValueError("Appended prices must be dated after the last price held")
+        if np.any(dates[1:] <= dates[:-1]):
+            raise ValueError("Appended prices must be in increasing date order")
+
+        needed = self._length + len(dates)
+
+        # Growing into new buffers when full, or when the current ones are read-only (memory-mapped)
+        # Earlier views keep pointing at the old buffers
+        if needed > len(self._closes) or not self._closes.flags.writeable:
+            capacity = needed + max(needed // 8, 64)
+
+            buffer = np.empty((capacity, len(self.tickers)), dtype=self.dtype)
+            buffer[:self._length] = self.closes
+            calendar = np.empty(capacity, dtype="datetime64[ns]")
+            calendar[:self._length] = self.dates
+
+            self._closes, self._dates = buffer, calendar
+
+        self._closes[self._length:needed] = closes
+        self._dates[self._length:needed] = dates
+        self._length = needed
+
+    # New store with rows merged in, rows on dates already held replacing them
+    def Merge(self, dates, closes):
+        dates = np.concatenate([self.dates, np.asarray(dates, dtype="datetime64[ns]")])
+        closes = np.concatenate([self.closes, np.asarray(closes, dtype=self.dtype).reshape(-1, len(self.tickers))])
+
+        order = np.argsort(dates, kind="stable")
+        dates, closes = dates[order], closes[order]
+        last = np.append(dates[1:] != dates[:-1], True)
+
+        return PriceStore(dates[last], np.ascontiguousarray(closes[last]), self.tickers, self.dtype)
+
+    # Frame with (ticker, "Close") columns over the rows held (no copy of the close matrix)
+    def Frame(self):
+        import pandas as pd
+
+        columns = pd.MultiIndex.from_tuples([(ticker, "Close") for ticker in self.tickers])
+        return pd.DataFrame(self.closes, index=pd.DatetimeIndex(self.dates), columns=columns, copy=False)
@@ -0,0 +1,403 @@
+import os
+import json
+import zlib
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import logging
+
+# Logging system
+# Taking config from root
+logger = logging.getLogger(__name__)
+
+# Every provider returns a frame indexed by date with (ticker, field) columns,
+# the same layout yfinance produces with group_by="ticker".
+# "Close" is the only field the engine relies on.
+
+# Building a (ticker, "Close") frame from per-ticker close series
+def closeFrame(closes):
+    if not closes:
+        return pd.DataFrame()
+
+    frame = pd.concat(closes, axis=1).sort_index()
+    frame.columns = pd.MultiIndex.from_tuples([(ticker, "Close") for ticker in closes])
+    return frame
+
+# Extracting a (dates x tickers) close matrix, in ticker order, from a provider frame
+def closeMatrix(frame, tickers):
+    closes = frame.loc[:, [(ticker, "Close") for ticker in tickers]].to_numpy(dtype=float)
+    return frame.index, closes
+
+# Normalizing a date range to [start, end) timestamps
+# A period (in calendar days) counts back from end, which defaults to today, like yfinance's "465d"
+def dateRange(start=None, end=None, period=None):
+    today = pd.Timestamp.today().normalize()
+
+    end = today + pd.Timedelta(days=1) if end is None else pd.Timestamp(end)
+    if start is None:
+        start = end - pd.Timedelta(days=period if period is not None else 365)
+    else:
+        start = pd.Timestamp(start)
+
+    return start, end
+
+# Base provider
+class DataProvider:
+
+    # Price history for tickers over [start, end)
+    def Download(self, tickers, start=None, end=None, period=None):
+        raise NotImplementedError
+
+# Yahoo Finance provider (default)
+class YahooProvider(DataProvider):
+
+    def Download(self, tickers, start=None, end=None, period=None):
+        import yfinance as yf
+
+        start, end = dateRange(start, end, period)
+        logger.info("DOWNLOADING FROM YFINANCE")
+        return yf.download(tickers=list(tickers), start=start, end=end, group_by="ticker", auto_adjust=True, progress=False)
+
+# Local file provider
+# Reads close prices from either
+#   - a single wide file (dates x tickers): .csv, .parquet or .npz
+#   - a directory of per-ticker files named <TICKER>.csv / .parquet / .npz
+# npz files hold "dates" (datetime64) and "closes", plus "tickers" for the wide layout
+# Files hold a fixed history, so when no end is given the range ends at the last date
+# in the requested tickers' data rather than today: a period counts back from that date
+class FileProvider(DataProvider):
+
+    EXTENSIONS = (".npz", ".parquet", ".csv")
+
+    def __init__(self, path):
+        self.path = path
+        self._table = None
+
+    # Reading one file into a dates x columns frame
+    @staticmethod
+    def Read(path, name=None):
+        if path.endswith(".npz"):
+            with np.load(path, allow_pickle=False) as archive:
+                dates = pd.DatetimeIndex(archive["dates"])
+                closes = archive["closes"]
+                columns = list(archive["tickers"]) if "tickers" in archive else [name]
+            return pd.DataFrame(closes.reshape(len(dates), -1), index=dates, columns=columns)
+
+        if path.endswith(".parquet"):
+            table = pd.read_parquet(path)
+        else:
+            table = pd.read_csv(path, index_col=0, parse_dates=True)
+
+        table.index = pd.DatetimeIndex(table.index)
+
+        # Per-ticker files may carry full OHLCV or a single column
+        if name is not None:
+            column = "Close" if "Close" in table.columns else table.columns[0]
+            table = table[[column]].set_axis([name], axis=1)
+
+        return table
+
+    # Locating the per-ticker file inside a directory
+    def _tickerFile(self, ticker):
+        for extension in self.EXTENSIONS:
+            path = os.path.join(self.path, f"{ticker}{extension}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def Download(self, tickers, start=None, end=None, period=None):
+
+        series = {}
+        for ticker in tickers:
+            if os.path.isdir(self.path):
+                path = self._tickerFile(ticker)
+                if path is None:
+                    raise ValueError(f"No local data for {ticker}")
+                series[ticker] = self.Read(path, ticker)[ticker].dropna()
+
+            else:
+                # Wide file is read once and kept
+                if self._table is None:
+                    self._table = self.Read(self.path)
+                if ticker not in self._table.columns:
+                    raise ValueError(f"No local data for {ticker}")
+                series[ticker] = self._table[ticker].dropna()
+
+        # Anchoring the range to the end of the file's history
+        if end is None:
+            last = [values.index.max() for values in series.values() if len(values)]
+            if last:
+                end = max(last).normalize() + pd.Timedelta(days=1)
+
+        start, end = dateRange(start, end, period)
+
+        closes = {ticker: values[(values.index >= start) & (values.index < end)] for ticker, values in series.items()}
+        return closeFrame(closes)
+
+# Synthetic price provider (no network)
+# Business-day closes from a one-factor model: every ticker loads on a shared market
+# return plus its own noise. Draws are seeded by (seed, ticker) and counted from a fixed
+# origin, so any ticker and date range is reproducible regardless of how it is requested.
+class SyntheticProvider(DataProvider):
+
+    ORIGIN = pd.Timestamp("2000-01-03")
+
+    def __init__(self, seed=0, drift=0.0003, market=0.01, noise=0.015):
+        self.seed = seed
+        self.drift = drift
+        self.market = market
+        self.noise = noise
+
+    def Download(self, tickers, start=None, end=None, period=None):
+        start, end = dateRange(start, end, period)
+
+        days = pd.bdate_range(self.ORIGIN, end - pd.Timedelta(days=1))
+        keep = days >= start
+        marketReturns = np.random.default_rng([self.seed]).normal(0, self.market, len(days))
+
+        closes = {}
+        for ticker in tickers:
+            rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode())])
+            beta = rng.uniform(0.5, 1.5)
+            returns = self.drift + beta * marketReturns + rng.normal(0, self.noise, len(days))
+            prices = 100 * np.cumprod(1 + np.maximum(returns, -0.5))
+            closes[ticker] = pd.Series(prices[keep], index=days[keep])
+
+        return closeFrame(closes)
+
+# On-disk caching layer around another provider
+# Close series are stored per ticker as <directory>/<TICKER>.npz together with the
+# date range already requested, so a refresh only fetches the uncovered part.
+# The layout is readable by FileProvider(directory) for fully offline use.
+class CachedProvider(DataProvider):
+
+    def __init__(self, provider=None, directory=".mopcache"):
+        self.provider = provider if provider is not None else YahooProvider()
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, ticker):
+        return os.path.join(self.directory, f"{ticker.replace(os.sep, '_')}.npz")
+
+    # Reading cached closes and the covered range for one ticker
+    def _load(self, ticker):
+        path = self._path(ticker)
+        if not os.path.exists(path):
+            return pd.Series(dtype=float, index=pd.DatetimeIndex([])), None, None
+
+        with np.load(path, allow_pickle=False) as archive:
+            series = pd.Series(archive["closes"], index=pd.DatetimeIndex(archive["dates"]))
+            covered = pd.Timestamp(archive["covered"][0]), pd.Timestamp(archive["covered"][1])
+
+        return series, covered[0], covered[1]
+
+    def _store(self, ticker, series, coveredStart, coveredEnd):
+        np.savez(
+            self._path(ticker),
+            dates=series.index.values.astype("datetime64[ns]"),
+            closes=series.values.astype(float),
+            covered=np.array([coveredStart, coveredEnd], dtype="datetime64[ns]")
+        )
+
+    # Ranges of [start, end) not yet covered by the cache
+    # Gaps always touch the covered range so coverage stays one contiguous span
+    @staticmethod
+    def _missing(start, end, coveredStart, coveredEnd):
+        if coveredStart is None:
+            return [(start, end)]
+
+        gaps = []
+        if start < coveredStart:
+            gaps.append((start, coveredStart))
+        if end > coveredEnd:
+            gaps.append((coveredEnd, end))
+        return gaps
+
+    def Download(self, tickers, start=None, end=None, period=None):
+        start, end = dateRange(start, end, period)
+
+        # Today's bar may still change, so coverage never extends past today
+        today = pd.Timestamp.today().normalize()
+
+        cached = {ticker: self._load(ticker) for ticker in tickers}
+
+        # Grouping tickers by identical gaps so each range is fetched in one call
+        gaps = {ticker: self._missing(start, end, coveredStart, coveredEnd) for ticker, (_, coveredStart, coveredEnd) in cached.items()}
+        requests = {}
+        for ticker in tickers:
+            for gap in gaps[ticker]:
+                requests.setdefault(gap, []).append(ticker)
+
+        # Gaps each ticker actually came back for
+        fetched = {ticker: [] for ticker in tickers}
+        received = {ticker: [] for ticker in tickers}
+        for (gapStart, gapEnd), group in requests.items():
+            logger.info(f"CACHE MISS FOR {len(group)} TICKERS ({gapStart.date()} - {gapEnd.date()})")
+            data = self.provider.Download(group, start=gapStart, end=gapEnd)
+
+            if data is None or data.empty:
+                continue
+            for ticker in group:
+                if ticker in data.columns.get_level_values(0):
+                    fetched[ticker].append(data[ticker]["Close"].dropna())
+                    received[ticker].append((gapStart, gapEnd))
+
+        closes = {}
+        for ticker, (series, coveredStart, coveredEnd) in cached.items():
+            # Only gaps the provider returned data for count as covered, so ranges requested
+            # while it was down (or that it had nothing for) are fetched again next time
+            if received[ticker]:
+                # Newer downloads take precedence over cached values
+                merged = pd.concat([series] + fetched[ticker])
+                merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+
+                # Gaps touch the covered range, so extending by each one keeps it contiguous
+                for gapStart, gapEnd in received[ticker]:
+                    if coveredStart is None:
+                        coveredStart, coveredEnd = gapStart, min(gapEnd, today)
+                    elif gapEnd == coveredStart:
+                        coveredStart = gapStart
+                    else:
+                        coveredEnd = max(coveredEnd, min(gapEnd, today))
+
+                self._store(ticker, merged, coveredStart, coveredEnd)
+                series = merged
+
+            closes[ticker] = series[(series.index >= start) & (series.index < end)]
+
+        return closeFrame(closes)
+
+# Market capitalisation sources (used by Black-Litterman market weights)
+# MarketCaps(tickers) returns {ticker: cap}; unavailable caps are 0
+
+# Thread-safe limiter spacing calls at most `rate` per second
+class RateLimiter:
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def Wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+
+        if delay > 0:
+            time.sleep(delay)
+
+# Base market cap source
+class MarketCapSource:
+
+    def MarketCaps(self, tickers):
+        raise NotImplementedError
+
+# Yahoo Finance market caps
+# Lookups run on a bounded thread pool, throttled by a shared rate limiter
+class YahooMarketCaps(MarketCapSource):
+
+    def __init__(self, workers=8, rate=4):
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+
+    def _fetch(self, ticker):
+        import yfinance as yf
+
+        self.limiter.Wait()
+        try:
+            cap = yf.Ticker(ticker).info.get('marketCap', 0)
+        except Exception:
+            logger.exception(f"MARKET CAP LOOKUP FAILED FOR {ticker}")
+            cap = 0
+
+        return float(cap) if cap else 0.0
+
+    def MarketCaps(self, tickers):
+        tickers = list(tickers)
+        if not tickers:
+            return {}
+
+        logger.info(f"FETCHING MARKET CAPITAL FOR {len(tickers)} TICKERS")
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(tickers))) as pool:
+            caps = list(pool.map(self._fetch, tickers))
+
+        return dict(zip(tickers, caps))
+
+# Fixed market caps held in memory
+# Used to hand already-resolved caps to worker processes
+class StaticMarketCaps(MarketCapSource):
+
+    def __init__(self, caps):
+        self.caps = dict(caps)
+
+    def MarketCaps(self, tickers):
+        return {ticker: self.caps.get(ticker, 0.0) for ticker in tickers}
+
+# Local file market caps
+# Reads a two-column CSV (ticker, market cap) or a JSON object {ticker: cap}
+class FileMarketCaps(MarketCapSource):
+
+    def __init__(self, path):
+        self.path = path
+        self._caps = None
+
+    def MarketCaps(self, tickers):
+        if self._caps is None:
+            if self.path.endswith(".json"):
+                with open(self.path) as file:
+                    self._caps = {str(k): float(v) for k, v in json.load(file).items()}
+            else:
+                table = pd.read_csv(self.path, index_col=0)
+                self._caps = {str(k): float(v) for k, v in table.iloc[:, 0].items()}
+
+        return {ticker: self._caps.get(ticker, 0.0) for ticker in tickers}
+
+# TTL cache in front of another market cap source
+# Only missing or expired tickers reach the underlying source
+# Failed lookups (cap of 0) are kept for the shorter failureTtl before being retried
+class MarketCapCache(MarketCapSource):
+
+    def __init__(self, source=None, ttl=86400, failureTtl=300):
+        self.source = source if source is not None else YahooMarketCaps()
+        self.ttl = ttl
+        self.failureTtl = failureTtl
+        self._caps = {}
+        self._lock = threading.Lock()
+
+    def _expired(self, ticker, now):
+        if ticker not in self._caps:
+            return True
+
+        cap, stamp = self._caps[ticker]
+        return now - stamp > (self.ttl if cap else self.failureTtl)
+
+    def MarketCaps(self, tickers):
+        now = time.monotonic()
+
+        with self._lock:
+            missing = [t for t in dict.fromkeys(tickers) if self._expired(t, now)]
+
+        if missing:
+            fetched = self.source.MarketCaps(missing)
+            with self._lock:
+                for ticker in missing:
+                    cap = fetched.get(ticker, 0.0)
+                    self._caps[ticker] = (0.0 if np.isnan(cap) else cap, now)
+
+        with self._lock:
+            return {t: self._caps[t][0] for t in tickers}
+
+    # Dropping cached caps (all, or for specific tickers)
+    def Clear(self, tickers=None):
+        with self._lock:
+            if tickers is None:
+                self._caps.clear()
+            else:
+                for ticker in tickers:
+                    self._caps.pop(ticker, None)
+
+# Process-wide market cap cache shared by every portfolio unless one is passed explicitly
+defaultMarketCaps = MarketCapCache()
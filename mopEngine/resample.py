@@ -0,0 +1,129 @@
+import os
+import numpy as np
+import logging
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+import mopEngine.models as models
+import mopEngine.estimators as estimators
+
+# Logging system
+# Taking config from root
+logger = logging.getLogger(__name__)
+
+# Resampled (bootstrap) optimization
+# Each draw resamples return rows with replacement and re-solves the method on the resample:
+# covariance methods refit the covariance (and volatility) on a resample of the lookback window,
+# scenario methods solve on a resample of the whole return history.
+# Draw i is seeded with (seed, i), so results do not depend on the number of workers or on
+# how draws are split between them.
+# Workers read the return matrix from one shared memory block created once per call;
+# tasks only carry a range of draw numbers.
+
+# Per-process state: the return matrix and the settings of the current call
+_state = {}
+
+# Solving draws [start, stop) on the matrix in _state
+# A failed draw yields NaN weights
+def _draws(bounds):
+    start, stop = bounds
+    returns, window, method, tickers, seed, model, factors, params = (
+        _state[key] for key in ("returns", "window", "method", "tickers", "seed", "model", "factors", "params")
+    )
+
+    T, n = returns.shape
+    recent = returns[T - window:]
+
+    solved = np.full((stop - start, n), np.nan)
+    for i in range(start, stop):
+        rng = np.random.default_rng([seed, i])
+
+        SIGMA, sigma, scenarios = None, None, None
+        if method in models.COVARIANCE_OPTIMIZERS:
+            sample = recent[rng.integers(0, window, window)]
+            SIGMA = estimators.covariance(sample, model, factors)
+            if method == "mdp":
+                sigma = estimators.volatility(np.log1p(sample))
+        else:
+            scenarios = returns[rng.integers(0, T, T)]
+
+        try:
+            solved[i - start] = models.Solve(method, np.ones(n) / n, SIGMA, sigma, scenarios, tickers, **params)
+        except ValueError as e:
+            logger.warning(f"RESAMPLED DRAW {i} FAILED: {e}")
+
+    return start, solved
+
+# Pool initializer: attaching to the shared return matrix
+def _attach(name, shape, dtype, settings):
+    # The parent owns the block and unlinks it when the pool is done
+    block = shared_memory.SharedMemory(name=name)
+    _state.update(settings, block=block, returns=np.ndarray(shape, dtype=dtype, buffer=block.buf))
+
+# Resampled optimization of `method` over `draws` bootstrap resamples of returns (T x n)
+# window is the number of most recent rows the covariance is fitted on (default: all)
+# workers > 1 spreads draws over a process pool (None = all cores)
+# Extra keyword arguments are the Solve parameters (risk, confidence, gamma, marketCaps, ...)
+# Returns {"weights": mean weights, "std", "lower", "upper" (5th / 95th percentiles),
+#          "draws": (draws x n) weights, NaN rows for failed draws, "failed": count}
+def resample(method, returns, tickers, draws=500, window=None, workers=None, seed=0, covariance="ledoit-wolf", factors=10, **params):
+
+    method = method.lower()
+    if method not in models.OPTIMIZERS:
+        logger.error("INVALID OPTIMIZER")
+        raise ValueError(f"Invalid Optimizer method: {method}")
+
+    returns = np.ascontiguousarray(returns, dtype=float)
+    window = len(returns) if window is None else min(window, len(returns))
+
+    settings = {
+        "window": window, "method": method, "tickers": list(tickers), "seed": seed,
+        "model": covariance, "factors": factors, "params": params
+    }
+
+    workers = min(workers or os.cpu_count() or 1, draws)
+    logger.info(f"RESAMPLING {method.upper()} OVER {draws} DRAWS ON {workers} WORKERS")
+
+    if workers > 1:
+        # A few tasks per worker balances uneven solve times
+        edges = np.linspace(0, draws, min(draws, 4 * workers) + 1).astype(int)
+        tasks = list(zip(edges[:-1], edges[1:]))
+
+        block = shared_memory.SharedMemory(create=True, size=max(returns.nbytes, 1))
+        try:
+            np.ndarray(returns.shape, dtype=returns.dtype, buffer=block.buf)[:] = returns
+
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_attach, initargs=(block.name, returns.shape, returns.dtype, settings)
+            ) as pool:
+                parts = list(pool.map(_draws, tasks))
+        finally:
+            block.close()
+            block.unlink()
+    else:
+        _state.update(settings, returns=returns)
+        try:
+            parts = [_draws((0, draws))]
+        finally:
+            _state.clear()
+
+    solved = np.vstack([weights for _, weights in sorted(parts, key=lambda part: part[0])])
+
+    valid = ~np.isnan(solved).any(axis=1)
+    if not valid.any():
+        logger.error("RESAMPLED OPTIMIZATION FAILED")
+        raise ValueError("Every resampled optimization failed")
+
+    kept = solved[valid]
+    mean = kept.mean(axis=0)
+    lower, upper = np.percentile(kept, [5, 95], axis=0)
+
+    logger.info("RESAMPLED OPTIMIZATION SUCCESSFUL")
+
+    return {
+        "weights": mean / mean.sum(),
+        "std": kept.std(axis=0, ddof=1) if len(kept) > 1 else np.zeros(len(mean)),
+        "lower": lower,
+        "upper": upper,
+        "draws": solved,
+        "failed": int((~valid).sum())
+    }
@@ -0,0 +1,98 @@
+import numpy as np
+import logging
+from mopEngine.estimators import FactorCovariance
+
+# Logging system
+# Taking config from root
+logger = logging.getLogger(__name__)
+
+# Simulated scenario sets for the scenario models (CVaR, Mean-CVaR, Kelly, CRRA, ERM)
+# A ScenarioSet is never materialized as one (count x n) matrix. Chunk i is regenerated
+# on demand from the seed (seed, i), so every pass sees identical scenarios, and only as many
+# chunks as fit in `memory` bytes are kept between passes.
+class ScenarioSet:
+
+    KINDS = ("normal", "t", "bootstrap")
+
+    # history: (T x n) historical returns, used for the mean and for bootstrap draws
+    # kind: "normal" (multivariate normal), "t" (multivariate Student-t with df degrees of freedom,
+    #       scaled to the same covariance) or "bootstrap" (rows resampled from history)
+    # covariance: dense matrix or FactorCovariance for normal/t draws (sample covariance by default)
+    def __init__(self, history, count=1_000_000, kind="normal", covariance=None, df=5, chunk=100_000, seed=0, dtype=np.float32, memory=512 * 2**20):
+
+        if kind not in self.KINDS:
+            raise ValueError(f"Invalid scenario kind: {kind}")
+        if kind == "t" and df <= 2:
+            raise ValueError("Degrees of freedom must exceed 2")
+
+        history = np.asarray(history, dtype=float)
+        self.kind = kind
+        self.count = int(count)
+        self.chunk = int(min(chunk, count))
+        self.seed = seed
+        self.df = df
+        self.dtype = np.dtype(dtype)
+        self.history = history
+        self.mu = history.mean(axis=0)
+
+        # Normal/t draws are mu + z L^T (dense) or mu + f B^T + e sqrt(D) (factor)
+        if kind != "bootstrap":
+            if covariance is None:
+                covariance = np.cov(history, rowvar=False)
+            if isinstance(covariance, FactorCovariance):
+                self._loadings = covariance.loadings
+                self._specific = np.sqrt(covariance.specific)
+                self._cholesky = None
+            else:
+                covariance = np.asarray(covariance)
+                jitter = 1e-12 * np.trace(covariance) / len(covariance)
+                self._cholesky = np.linalg.cholesky(covariance + jitter * np.eye(len(covariance)))
+
+        # Chunks retained between passes
+        self._cache = {}
+        self._capacity = int(memory // (self.chunk * history.shape[1] * self.dtype.itemsize))
+
+    @property
+    def shape(self):
+        return (self.count, self.history.shape[1])
+
+    @property
+    def chunks(self):
+        return -(-self.count // self.chunk)
+
+    # Generating chunk i (deterministic in seed and i)
+    def Chunk(self, i):
+        if i in self._cache:
+            return self._cache[i]
+
+        rows = min(self.chunk, self.count - i * self.chunk)
+        rng = np.random.default_rng([self.seed, i])
+        n = self.history.shape[1]
+
+        if self.kind == "bootstrap":
+            block = self.history[rng.integers(0, len(self.history), rows)]
+
+        else:
+            if self._cholesky is not None:
+                block = rng.standard_normal((rows, n)) @ self._cholesky.T
+            else:
+                k = self._loadings.shape[1]
+                block = rng.standard_normal((rows, k)) @ self._loadings.T + rng.standard_normal((rows, n)) * self._specific
+
+            # Student-t: normal draws over sqrt(chi2/df), rescaled to keep the covariance
+            if self.kind == "t":
+                mixing = np.sqrt(rng.chisquare(self.df, rows) / (self.df - 2))
+                block /= mixing[:, None]
+
+            block += self.mu
+
+        block = block.astype(self.dtype, copy=False)
+        if len(self._cache) < self._capacity:
+            self._cache[i] = block
+
+        return block
+
+    # Iterating over every chunk in order
+    def Chunks(self):
+        for i in range(self.chunks):
+            yield self.Chunk(i)
@@ -0,0 +1,411 @@
+# Asyncio optimization service
+# A local HTTP/1.1 JSON service in front of the engine, for many concurrent users in one process.
+#
+#   python -m mopEngine.service --port 8765 --workers 4
+#   python -m mopEngine.service --synthetic 0        # stub data, no network
+#
+# Endpoints (JSON bodies and responses):
+#   POST /optimize     {"tickers": [...], "method": "cvar", "params": {"confidence": 0.95},
+#                       "views": {"P": ..., "Q": ..., "OMEGA": ...}, "window": 100,
+#                       "covariance": "ledoit-wolf", "factors": 10}
+#                   -> {"weights": {ticker: weight}, "cached": bool, "coalesced": bool, "seconds": s}
+#   POST /performance  {"tickers": [...], "weights": [...] or {ticker: weight}, "start": "2020-01-01",
+#                       "end": "2021-01-01", "cost": 0.0005}
+#                   -> {"metrics": {metric: value}, "seconds": s}
+#   GET  /stats        request, solve, coalescing and cache counters
+#
+# Prices, return matrices, covariances and market caps are cached across requests (entries
+# expire after `ttl` seconds and at most `entries` of each kind are kept, least recently used
+# first out) and optimization results are memoized in a cache.ResultCache.
+# Concurrent identical requests are coalesced: the first starts the work and the others
+# await the same future, so a burst of N equal requests costs one fetch and one solve.
+# Blocking work never runs on the event loop: fetching and estimation run on a thread pool,
+# solves and backtests on a process pool.
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+import functools
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+import mopEngine.models as models
+import mopEngine.backtest as backtest
+from mopEngine.cache import ResultCache, fingerprint
+from mopEngine.prices import PriceStore
+
+# Logging system
+# Taking config from root
+logger = logging.getLogger(__name__)
+
+# Client errors, answered with status 400
+class ServiceError(Exception):
+    pass
+
+# Unknown routes, answered with status 404
+class NotFound(ServiceError):
+    pass
+
+# Solving in a worker process
+def _solve(task):
+    method, SIGMA, sigma, returns, tickers, params = task
+    n = len(tickers)
+    return models.Solve(method, np.ones(n) / n, SIGMA, sigma, returns, tickers, **params)
+
+# Start method of the solver processes
+# Forked workers would inherit the listening socket, open client connections and the running
+# thread pool, so they are started from a clean server process instead (spawn where unavailable)
+def _context():
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+# Building a portfolio's lazy returns, covariance, volatility and fingerprint now,
+# so requests never build them on the event loop
+def _prepare(portfolio):
+    for name in ("volatility", "fingerprint"):
+        getattr(portfolio, name)
+
+# Backtesting in a worker process
+def _backtest(task):
+    returns, weights, cost = task
+    values = backtest.backtest(returns, weights[None, :], cost)
+    return {metric: float(values[metric][0]) for metric in backtest.METRICS}
+
+class OptimizationService:
+
+    # provider supplies prices (defaults to Yahoo Finance), marketCaps the Black-Litterman caps
+    # workers is the size of the solver process pool (None = all cores)
+    # period is the calendar days of history fetched; ttl is how long fetched data is reused
+    # entries bounds each kind of cached data (prices, portfolios, caps, backtests), least recently used first out
+    def __init__(self, provider=None, marketCaps=None, workers=None, cache=None, period=465, ttl=3600, entries=256):
+        from mopEngine.providers import YahooProvider, defaultMarketCaps
+
+        self.provider = provider if provider is not None else YahooProvider()
+        self.marketCaps = marketCaps if marketCaps is not None else defaultMarketCaps
+        self.workers = workers or os.cpu_count() or 1
+        self.cache = cache if cache is not None else ResultCache()
+        self.period = period
+        self.ttl = ttl
+        self.entries = entries
+
+        # kind -> {key: (time stored, value)}, least recently used first
+        self._data = {kind: OrderedDict() for kind in ("prices", "portfolio", "caps", "backtest")}
+
+        # Futures of work in progress, by key
+        self._inflight = {}
+
+        self.counts = {"requests": 0, "errors": 0, "solves": 0, "coalesced": 0, "fetches": 0, "backtests": 0}
+        self._pool = None
+        self._threads = None
+        self._server = None
+
+        # Open connections: handler task -> stream writer
+        self._connections = {}
+
+    # Listening on host:port (port 0 picks a free port, see address)
+    async def Start(self, host="127.0.0.1", port=8765):
+        from mopEngine.batch import quiet
+
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_context(), initializer=quiet)
+        self._threads = ThreadPoolExecutor(max_workers=max(4, self.workers))
+        self._server = await asyncio.start_server(self._connection, host, port)
+
+        logger.info(f"SERVING ON {self.address}")
+        return self
+
+    @property
+    def address(self):
+        return self._server.sockets[0].getsockname()[:2] if self._server else None
+
+    # Stopping the server, closing open connections and shutting the pools down
+    async def Close(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+
+        # Waiting for the pools off the event loop
+        loop = asyncio.get_running_loop()
+        for pool in (self._pool, self._threads):
+            if pool is not None:
+                await loop.run_in_executor(None, functools.partial(pool.shutdown, cancel_futures=True))
+
+    # Running factory() once for concurrent callers with the same key
+    # Later callers await the first caller's future; a cancelled caller does not cancel the work
+    async def _once(self, key, factory):
+        future = self._inflight.get(key)
+        if future is not None:
+            self.counts["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(factory())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    # Cached value of one kind, built (once, even under concurrency) when missing or expired
+    # valid(value) can reject an entry early (e.g. one built on data that has since been refetched)
+    async def _cached(self, kind, key, build, valid=None):
+        entries = self._data[kind]
+        entry = entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl and (valid is None or valid(entry[1])):
+            entries.move_to_end(key)
+            return entry[1]
+
+        async def store():
+            value = await build()
+            now = time.monotonic()
+
+            # Dropping expired entries, then the least recently used beyond the bound
+            for stale in [stale for stale, (stored, _) in entries.items() if now - stored >= self.ttl]:
+                del entries[stale]
+            entries[key] = (now, value)
+            entries.move_to_end(key)
+            while len(entries) > self.entries:
+                entries.popitem(last=False)
+
+            return value
+
+        return await self._once((kind, key), store)
+
+    # Blocking call on the thread pool
+    async def _thread(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._threads, function, *args)
+
+    # Close prices of tickers, fetched once and shared by every window and covariance model
+    async def _prices(self, tickers):
+        def fetch():
+            self.counts["fetches"] += 1
+            frame = self.provider.Download(list(tickers), period=self.period)
+            if frame.empty:
+                raise ServiceError(f"No data returned for {', '.join(tickers)}")
+            return PriceStore.FromFrame(frame, tickers)
+
+        return await self._cached("prices", tuple(tickers), lambda: self._thread(fetch))
+
+    # Portfolio over shared prices with its returns, covariance, volatility and fingerprint built
+    # Rebuilt whenever its prices have been refetched
+    async def _portfolio(self, tickers, window, covariance, factors):
+        from mopEngine.portfolio import Portfolio
+
+        tickers = tuple(tickers)
+        prices = await self._prices(tickers)
+
+        def build():
+            try:
+                portfolio = Portfolio(list(tickers), 1, self.provider, self.marketCaps, covariance, factors, window, self.cache)
+            except Portfolio.PortfolioError as e:
+                raise ServiceError(str(e))
+            portfolio.prices = prices
+            _prepare(portfolio)
+            return portfolio
+
+        key = (tickers, window, covariance, factors)
+        return await self._cached("portfolio", key, lambda: self._thread(build), lambda portfolio: portfolio.prices is prices)
+
+    async def _caps(self, tickers):
+        return await self._cached("caps", tuple(tickers), lambda: self._thread(self.marketCaps.MarketCaps, list(tickers)))
+
+    async def Optimize(self, tickers, method="variance", params=None, views=None, window=100, covariance="ledoit-wolf", factors=10):
+        from mopEngine.providers import StaticMarketCaps
+
+        start = time.perf_counter()
+        method, params, views = str(method).lower(), dict(params or {}), views or {}
+
+        if not tickers:
+            raise ServiceError("No tickers given")
+        if method not in models.OPTIMIZERS:
+            raise ServiceError(f"Invalid Optimizer method: {method}")
+
+        portfolio = await self._portfolio(tickers, int(window), covariance, factors)
+
+        for name, key in (("P", "p"), ("Q", "q"), ("OMEGA", "omega")):
+            if name in views:
+                params[key] = np.array(views[name], dtype=float)
+
+        caps = None
+        if method == "mean-variance":
+            caps = await self._caps(tickers)
+            params["marketCaps"] = StaticMarketCaps(caps)
+
+        key = self.cache.Key(portfolio.fingerprint, fingerprint(method, sorted((k, v) for k, v in params.items() if k != "marketCaps"), caps))
+
+        # Finished results come from the cache; results in progress are awaited
+        weights = self.cache.Get(key)
+        cached = weights is not None
+        coalesced = not cached and ("solve", key) in self._inflight
+
+        if not cached:
+            async def solve():
+                self.counts["solves"] += 1
+                task = (
+                    method, portfolio.covar, portfolio.volatility if method == "mdp" else None,
+                    portfolio.returns, list(tickers), params
+                )
+                try:
+                    result = await asyncio.get_running_loop().run_in_executor(self._pool, _solve, task)
+                except ValueError as e:
+                    raise ServiceError(str(e))
+                self.cache.Put(key, result)
+                return result
+
+            weights = await self._once(("solve", key), solve)
+
+        return {
+            "weights": dict(zip(tickers, np.asarray(weights, dtype=float).tolist())),
+            "cached": cached,
+            "coalesced": coalesced,
+            "seconds": time.perf_counter() - start
+        }
+
+    async def Performance(self, tickers, weights, start, end, cost=0):
+        began = time.perf_counter()
+        tickers = tuple(tickers)
+
+        if isinstance(weights, dict):
+            weights = [weights.get(ticker, 0.0) for ticker in tickers]
+        weights = np.asarray(weights, dtype=float)
+        if weights.shape != (len(tickers),):
+            raise ServiceError(f"Expected {len(tickers)} weights, got {weights.size}")
+
+        def fetch():
+            self.counts["fetches"] += 1
+            frame = self.provider.Download(list(tickers), start=start, end=end)
+            if frame.empty:
+                raise ServiceError(f"No data returned for {', '.join(tickers)} over {start} - {end}")
+            return PriceStore.FromFrame(frame, tickers).Returns()[1]
+
+        returns = await self._cached("backtest", (tickers, str(start), str(end)), lambda: self._thread(fetch))
+
+        self.counts["backtests"] += 1
+        metrics = await asyncio.get_running_loop().run_in_executor(self._pool, _backtest, (returns, weights, float(cost)))
+
+        return {"metrics": metrics, "seconds": time.perf_counter() - began}
+
+    def Stats(self):
+        return {
+            **self.counts,
+            "inflight": len(self._inflight),
+            "cached": {kind: len(entries) for kind, entries in self._data.items()},
+            "results": self.cache.Stats()
+        }
+
+    # Dispatching one decoded request
+    async def _route(self, verb, path, body):
+        if verb == "GET" and path == "/stats":
+            return self.Stats()
+        if verb == "GET" and path == "/health":
+            return {"status": "ok"}
+
+        if verb == "POST" and path == "/optimize":
+            return await self.Optimize(
+                body.get("tickers"), body.get("method", "variance"), body.get("params"), body.get("views"),
+                body.get("window", 100), body.get("covariance", "ledoit-wolf"), body.get("factors", 10)
+            )
+        if verb == "POST" and path == "/performance":
+            return await self.Performance(body.get("tickers"), body.get("weights"), body.get("start"), body.get("end"), body.get("cost", 0))
+
+        raise NotFound(f"No route for {verb} {path}")
+
+    # Serving one connection (HTTP/1.1 with keep-alive)
+    async def _connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+
+                lines = head.decode("latin-1").split("\r\n")
+                verb, path, version = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                raw = await reader.readexactly(length) if length else b""
+
+                status, payload = await self._respond(verb.upper(), path.split("?", 1)[0], raw)
+
+                keepAlive = headers.get("connection", "").lower() != "close" and version.upper() != "HTTP/1.0"
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keepAlive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+
+                if not keepAlive:
+                    break
+
+        except (ConnectionError, ValueError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    # Status line and JSON payload for one request
+    async def _respond(self, verb, path, raw):
+        self.counts["requests"] += 1
+        try:
+            body = json.loads(raw) if raw else {}
+            if not isinstance(body, dict):
+                raise ServiceError("Request body must be a JSON object")
+            return "200 OK", await self._route(verb, path, body)
+
+        except NotFound as e:
+            self.counts["errors"] += 1
+            return "404 Not Found", {"error": str(e)}
+        except (ServiceError, json.JSONDecodeError, TypeError, ValueError) as e:
+            self.counts["errors"] += 1
+            return "400 Bad Request", {"error": str(e)}
+        except Exception as e:
+            self.counts["errors"] += 1
+            logger.exception("REQUEST FAILED")
+            return "500 Internal Server Error", {"error": str(e)}
+
+# Running the service until interrupted
+async def serve(service, host="127.0.0.1", port=8765):
+    await service.Start(host, port)
+    try:
+        await service._server.serve_forever()
+    finally:
+        await service.Close()
+
+def main(argv=None):
+    from mopEngine.batch import addSourceArguments, sources, quiet
+
+    parser = argparse.ArgumentParser(description="Local asyncio optimization service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="solver processes (default: all cores)")
+    parser.add_argument("--ttl", type=float, default=3600, help="seconds fetched data is reused")
+    parser.add_argument("--entries", type=int, default=256, help="cached items kept per kind of data")
+    addSourceArguments(parser)
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        quiet()
+
+    provider, marketCaps = sources(args)
+    service = OptimizationService(provider, marketCaps, args.workers, ttl=args.ttl, entries=args.entries)
+
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
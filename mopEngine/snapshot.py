@@ -0,0 +1,57 @@
+import os
+import json
+import numpy as np
+import logging
+
+# Logging system
+# Taking config from root
+logger = logging.getLogger(__name__)
+
+# Portfolio snapshots
+# A snapshot is a directory holding meta.json plus one .npy file per array.
+# Plain .npy files can be memory-mapped on load, so reopening a snapshot costs
+# a file map rather than a download, and nothing is ever unpickled.
+# meta.json is written last: a snapshot without it is incomplete and will not load.
+VERSION = 1
+META = "meta.json"
+
+class SnapshotError(Exception):
+    pass
+
+# Writing arrays and JSON metadata to a snapshot directory
+def save(path, meta, arrays):
+
+    # Replacing a single-file save from earlier versions
+    if os.path.isfile(path):
+        os.remove(path)
+    os.makedirs(path, exist_ok=True)
+
+    # Dropping a previous snapshot first so an interrupted save is never loadable
+    for entry in os.listdir(path):
+        if entry == META or entry.endswith(".npy"):
+            os.remove(os.path.join(path, entry))
+
+    for key, array in arrays.items():
+        np.save(os.path.join(path, f"{key}.npy"), np.asarray(array), allow_pickle=False)
+
+    with open(os.path.join(path, META), "w") as file:
+        json.dump({**meta, "version": VERSION, "arrays": sorted(arrays)}, file)
+
+# Reading a snapshot directory
+# Returns (meta, {key: array}); arrays are read-only memory maps when mmap is set
+def load(path, mmap=True):
+    try:
+        with open(os.path.join(path, META)) as file:
+            meta = json.load(file)
+    except FileNotFoundError:
+        raise SnapshotError(f"No snapshot at {path}")
+
+    if meta.get("version") != VERSION:
+        raise SnapshotError(f"Unsupported snapshot version: {meta.get('version')}")
+
+    arrays = {
+        key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r" if mmap else None, allow_pickle=False)
+        for key in meta["arrays"]
+    }
+
+    return meta, arrays
@@ -0,0 +1,59 @@
+import os
+import numpy as np
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import mopEngine.models as models
+
+# Logging system
+# Taking config from root
+logger = logging.getLogger(__name__)
+
+# Parameters of models.Solve that can be swept
+SWEEPABLE = ("risk", "time", "confidence", "lambdaBL", "tauBL", "fraction", "theta", "gamma")
+
+# Solving one contiguous run of grid points (runs inside worker processes)
+# Each point starts from its neighbour's solution when warm is set
+# A failed point yields NaN weights and the next point restarts from the last success
+def _sweepChunk(task):
+    method, param, values, SIGMA, sigma, returns, tickers, warm, params = task
+
+    n = SIGMA.shape[0] if SIGMA is not None else returns.shape[1]
+    start = np.ones(n) / n
+
+    solved = []
+    for value in values:
+        try:
+            weights = models.Solve(method, start, SIGMA, sigma, returns, tickers, **{**params, param: value})
+        except ValueError as e:
+            logger.warning(f"SWEEP POINT {param}={value} FAILED: {e}")
+            solved.append(np.full(n, np.nan))
+            continue
+
+        solved.append(weights)
+        if warm:
+            start = weights
+
+    return solved
+
+# Solving `method` for every value of `param` over shared inputs
+# The grid is split into `workers` contiguous chunks; each chunk is warm-started sequentially
+# Returns a (K x n) weights matrix in the order of `values`
+def sweep(method, param, values, SIGMA, sigma, returns, tickers, warm=True, workers=1, **params):
+
+    values = list(values)
+    if param not in SWEEPABLE:
+        raise ValueError(f"Parameter {param} cannot be swept")
+
+    workers = min(workers or os.cpu_count() or 1, len(values))
+    logger.info(f"SWEEPING {method.upper()} OVER {len(values)} VALUES OF {param.upper()}")
+
+    if workers > 1:
+        chunks = [list(chunk) for chunk in np.array_split(np.array(values, dtype=float), workers)]
+        tasks = [(method, param, chunk, SIGMA, sigma, returns, tickers, warm, params) for chunk in chunks]
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            solved = [weights for chunk in pool.map(_sweepChunk, tasks) for weights in chunk]
+    else:
+        solved = _sweepChunk((method, param, values, SIGMA, sigma, returns, tickers, warm, params))
+
+    return np.array(solved)
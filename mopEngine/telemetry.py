@@ -0,0 +1,106 @@
+import time
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+import logging
+
+# Logging system
+# Taking config from root
+logger = logging.getLogger(__name__)
+
+# Instrumentation
+# Pipeline stages are timed with `stage(name)` and solver outcomes reported with `solver(...)`.
+# Every event is a dict passed to each subscribed observer, and is also collected into
+# every `record()` active in the current context (Portfolio keeps the last one as .stats).
+#
+# Stage events:  {"type": "stage", "stage": name, "seconds": s, ...extra fields}
+# Solver events: {"type": "solver", "solver": "slsqp" | "pgd" | "highs", "nit", "nfev", "njev", "status", "success", "message"}
+# Cache events:  {"type": "cache", "event": "hit" | "miss" | "eviction"} (see cache.ResultCache)
+#
+# Stages nest (an optimization may build the covariance it needs), so stage times are inclusive.
+# Work run in worker processes (sweeps, walk-forward windows, resampled draws, Pareto points) is not reported.
+
+STAGES = ("fetch", "returns", "covariance", "volatility", "marketcaps", "optimize", "backtest", "resample", "pareto")
+
+_observers = []
+_lock = threading.Lock()
+_records = contextvars.ContextVar("records", default=())
+
+# Registering a callable that receives every event
+def subscribe(observer):
+    with _lock:
+        _observers.append(observer)
+    return observer
+
+def unsubscribe(observer):
+    with _lock:
+        if observer in _observers:
+            _observers.remove(observer)
+
+# Delivering an event to the active records and to every observer
+# Observer failures are logged and never interrupt the engine
+def emit(event):
+    for stats in _records.get():
+        if event["type"] == "stage":
+            stats["stages"][event["stage"]] = stats["stages"].get(event["stage"], 0.0) + event["seconds"]
+        elif event["type"] == "solver":
+            stats["solves"].append({key: value for key, value in event.items() if key != "type"})
+        elif event["type"] == "cache":
+            stats["cache"][event["event"]] = stats["cache"].get(event["event"], 0) + 1
+
+    with _lock:
+        observers = list(_observers)
+
+    for observer in observers:
+        try:
+            observer(event)
+        except Exception:
+            logger.exception("TELEMETRY OBSERVER FAILED")
+
+# Timing a block as one stage
+@contextmanager
+def stage(name, **fields):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        emit({"type": "stage", "stage": name, "seconds": time.perf_counter() - start, **fields})
+
+# Reporting a solver outcome
+# result is a scipy OptimizeResult or any object with the same attributes
+def solver(name, result):
+    emit({
+        "type": "solver",
+        "solver": name,
+        "nit": getattr(result, "nit", None),
+        "nfev": getattr(result, "nfev", None),
+        "njev": getattr(result, "njev", None),
+        "status": getattr(result, "status", None),
+        "success": bool(getattr(result, "success", False)),
+        "message": str(getattr(result, "message", ""))
+    })
+
+# Collecting the events of one call
+# Yields {"stages": {name: seconds}, "solves": [solver stats], "cache": {event: count}, "seconds": total}
+@contextmanager
+def record():
+    stats = {"stages": {}, "solves": [], "cache": {}, "seconds": 0.0}
+    token = _records.set(_records.get() + (stats,))
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats["seconds"] = time.perf_counter() - start
+        _records.reset(token)
+
+# Method decorator recording each call into self.stats
+def recorded(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with record() as stats:
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.stats = stats
+    return wrapper